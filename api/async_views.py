@@ -0,0 +1,86 @@
+"""
+Async twins of the read-only API endpoints, for deployments served through djangoProject.asgi. They run on
+Django's async ORM, so a slow report waits on the database without holding a worker thread. DRF views are
+sync-only, so these are plain Django views returning JsonResponse with the same payloads as their sync siblings.
+"""
+from functools import wraps
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+from . import reports
+from .views import MODEL_VIEWSETS, STREAM_CHUNK_SIZE, custom_model_query, cursor_page, get_generic_viewset
+import json
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+def async_api_view(view):
+    """GET-only, session-authenticated, with DRF exceptions rendered the way @api_view would."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return json_response({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+        if not (await request.auser()).is_authenticated:
+            # Session authentication has no WWW-Authenticate challenge, so DRF answers 403 rather than 401
+            return json_response({"detail": NotAuthenticated.default_detail}, status=403)
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as e:
+            detail = e.detail if isinstance(e.detail, (list, dict)) else {"detail": e.detail}
+            return json_response(detail, status=e.status_code)
+    return wrapper
+
+
+async def astream_json_array(rows):
+    yield "["
+    buffer = []
+    i = 0
+    async for row in rows:
+        buffer.append(("," if i else "") + json.dumps(row, cls=JSONEncoder))
+        i += 1
+        if len(buffer) == STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    yield "".join(buffer) + "]"
+
+
+@async_api_view
+async def custom_model_list_view(request, model_name):
+    qs, serialize, limit = custom_model_query(model_name, request.GET)
+    if limit:
+        return json_response(cursor_page([serialize(row) async for row in qs], limit))
+
+    if request.GET.get("stream"):
+        rows = (serialize(row) async for row in qs.aiterator(chunk_size=STREAM_CHUNK_SIZE))
+        return StreamingHttpResponse(astream_json_array(rows), content_type="application/json")
+
+    return json_response([serialize(row) async for row in qs])
+
+
+@async_api_view
+async def model_list_view(request, model):
+    # Same queryset and serializer as the router's list action for `model`
+    viewset = (MODEL_VIEWSETS.get(model) or get_generic_viewset(model))()
+    serialize = viewset.get_serializer_class()().to_representation
+    return json_response([serialize(obj) async for obj in viewset.get_queryset()])
+
+
+@async_api_view
+async def inventory_by_status_view(request):
+    try:
+        filters = reports.report_filters(request.GET)
+    except ValueError as e:
+        return json_response({"detail": str(e)}, status=400)
+    return json_response([row async for row in reports.inventory_by_status_query(**filters)])
+
+
+@async_api_view
+async def inventory_in_store_view(request):
+    return json_response([row async for row in reports.inventory_in_store_query()])
+
+
+@async_api_view
+async def inventory_on_rent_view(request):
+    return json_response([row async for row in reports.inventory_on_rent_query()])
@@ -1,46 +1,54 @@
+from functools import cache
 from rest_framework import serializers
 from django.db.models import ForeignKey, ManyToManyField
 
+
+@cache
+def relation_fields(model):
+    # Forward FKs and M2Ms, the only fields AutoNestedSerializer expands
+    return [
+        f for f in model._meta.get_fields()
+        if (not f.auto_created or f.many_to_many or f.concrete) and isinstance(f, (ForeignKey, ManyToManyField))
+    ]
+
+
+def with_related(queryset):
+    """Join or prefetch every relation AutoNestedSerializer expands, so listing costs O(1) queries."""
+    fields = relation_fields(queryset.model)
+    if fks := [f.name for f in fields if isinstance(f, ForeignKey)]:
+        queryset = queryset.select_related(*fks)
+    if m2ms := [f.name for f in fields if isinstance(f, ManyToManyField)]:
+        queryset = queryset.prefetch_related(*m2ms)
+    return queryset
+
+
+@cache
+def nested_serializer(model):
+    # One shared instance per model, so DRF builds its field list once instead of once per row
+    nested_fields = [
+        f.name for f in model._meta.get_fields()
+        if not (f.auto_created and not f.concrete)
+    ]
+    serializer_class = type(
+        'NestedSerializer',
+        (serializers.ModelSerializer,),
+        {'Meta': type('Meta', (), {'model': model, 'fields': nested_fields})}
+    )
+    return serializer_class()
+
+
 class AutoNestedSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         ret = super().to_representation(instance)
-        model = self.Meta.model
-
-        # Include forward fields, reverse M2M, and auto-created concrete fields like 'id'
-        forward_fields = [
-            f for f in model._meta.get_fields()
-            if not f.auto_created or (f.auto_created and (f.many_to_many or f.concrete))
-        ]
 
-        for field in forward_fields:
+        for field in relation_fields(self.Meta.model):
             value = getattr(instance, field.name, None)
 
             if isinstance(field, ForeignKey) and value is not None:
-                nested_fields = [
-                    f.name for f in value._meta.get_fields()
-                    if not (f.auto_created and not f.concrete)
-                ]
-                serializer_class = type(
-                    'NestedSerializer',
-                    (serializers.ModelSerializer,),
-                    {'Meta': type('Meta', (), {'model': value.__class__, 'fields': nested_fields})}
-                )
-                ret[field.name] = serializer_class(value).data
+                ret[field.name] = nested_serializer(value.__class__).to_representation(value)
 
             elif isinstance(field, ManyToManyField):
                 objs = value.all() if value else []
-                if objs:
-                    nested_fields = [
-                        f.name for f in objs[0]._meta.get_fields()
-                        if not (f.auto_created and not f.concrete)
-                    ]
-                    serializer_class = type(
-                        'NestedSerializer',
-                        (serializers.ModelSerializer,),
-                        {'Meta': type('Meta', (), {'model': objs[0].__class__, 'fields': nested_fields})}
-                    )
-                    ret[field.name] = [serializer_class(obj).data for obj in objs]
-                else:
-                    ret[field.name] = []
+                ret[field.name] = [nested_serializer(obj.__class__).to_representation(obj) for obj in objs]
 
         return ret
@@ -0,0 +1,71 @@
+from hashlib import md5
+from time import time_ns
+from django.core.cache import cache
+from django.db.transaction import on_commit
+
+# Counts may lag bulk writes that skip signals by at most this long.
+COUNT_TIMEOUT = 300
+# Master-data lists live at most this long, bounding staleness where each worker has its own (local-memory) cache.
+MASTER_TIMEOUT = 60
+
+
+def version_key(model):
+    return f"version:{model._meta.label_lower}"
+
+
+def model_version(model):
+    # Versions start from the clock rather than 1, so a key that was evicted never returns to a value whose
+    # entries may still be cached
+    return cache.get_or_set(version_key(model), time_ns, timeout=None)
+
+
+def bump_key(key):
+    """
+    Move the version stored at `key` on, now and again once the current transaction commits, so a concurrent
+    reader cannot re-cache pre-commit data under the new version.
+    """
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time_ns(), timeout=None)
+    bump()
+    on_commit(bump)
+
+
+def bump_version(model):
+    """Invalidate every cached value derived from `model`."""
+    bump_key(version_key(model))
+
+
+def object_version_key(model, pk):
+    return f"version:{model._meta.label_lower}:{pk}"
+
+
+def object_version(model, pk):
+    return cache.get_or_set(object_version_key(model, pk), time_ns, timeout=None)
+
+
+def bump_object_version(model, pk):
+    """Invalidate cached values derived from the single row `pk` of `model`, such as a rendered challan."""
+    bump_key(object_version_key(model, pk))
+
+
+def cached_count(queryset):
+    """queryset.count(), cached until the model's next write."""
+    query_hash = md5(str(queryset.query).encode()).hexdigest()
+    key = f"count:{queryset.model._meta.label_lower}:{model_version(queryset.model)}:{query_hash}"
+    return cache.get_or_set(key, queryset.count, timeout=COUNT_TIMEOUT)
+
+
+def cached_for(name, models, compute, timeout=MASTER_TIMEOUT):
+    """compute(), cached under `name` until the next write to any of `models`."""
+    versions = ":".join(str(model_version(model)) for model in models)
+    return cache.get_or_set(f"{name}:{versions}", compute, timeout=timeout)
+
+
+def cached_list(queryset, *depends):
+    """list(queryset), cached until the next write to its model or any of the `depends` models it reads."""
+    query_hash = md5(str(queryset.query).encode()).hexdigest()
+    return cached_for(f"list:{queryset.model._meta.label_lower}:{query_hash}", [queryset.model, *depends],
+                      lambda: list(queryset))
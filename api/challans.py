@@ -0,0 +1,229 @@
+"""
+Vector PDF challans for rentals and rental returns, drawn with reportlab in place of the browser-rasterized HTML
+page. A rendered challan is cached until the challan, its units or the master rows it prints change.
+"""
+from functools import cache as memoize
+from io import BytesIO
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfgen.canvas import Canvas
+from .cache import model_version, object_version
+from .models import Customer, CustomerAddress, PrinterModel, Rental, RentalReturn, RentalReturnUnit, RentalUnit
+
+COMPANY_NAME = "SAVIOUR PRINTSOL PVT LTD"
+COMPANY_ADDRESS = "2094,Rajdanga Main Road, Kolkata-700107"
+COMPANY_MOBILE = "Mobile : +91 6289901500 / 8617731586"
+TAGLINE = "Computer and Accessories, Printers & Cartridge Supplier & Hardware and Network Provider"
+LOGO = settings.BASE_DIR / "frontend" / "static" / "images" / "icon.png"
+LOGO_SIZE = (40, 48)
+
+# (units model, FK from it to the challan, heading, note above the table)
+CHALLAN_KINDS = {
+    Rental: (RentalUnit, "rental", "CHALLAN", "Received the following goods in good order and condition"),
+    RentalReturn: (RentalReturnUnit, "rental_return", "RETURN CHALLAN", "Returned the following goods"),
+}
+# Master rows printed on every challan; editing any of them re-renders all challans
+PRINTED_MASTERS = (Customer, CustomerAddress, PrinterModel)
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+LEFT, RIGHT, TOP, BOTTOM = 49, PAGE_WIDTH - 52, PAGE_HEIGHT - 19, 20
+COLUMNS = [("SL. NO.", 0.0836), ("Qnty", 0.112), ("DESCRIPTION", 0.6644), ("Rate", 0.14)]
+FOOTER_HEIGHT = 74
+LINE = 13
+
+
+def challan_cache_key(model, pk):
+    versions = ":".join(str(model_version(m)) for m in PRINTED_MASTERS)
+    return f"challan-pdf:{model._meta.label_lower}:{pk}:{object_version(model, pk)}:{versions}"
+
+
+def load_challans(challans):
+    """Pair each challan of the `challans` queryset with its (printer model name, [serial labels]) rows."""
+    units_model, fk, _, _ = CHALLAN_KINDS[challans.model]
+    challans = list(challans.select_related("customer_address__customer"))
+    rows = (
+        units_model.objects.filter(**{f"{fk}_id__in": [c.pk for c in challans]})
+        .order_by("printer_unit__printer_model__name", "printer_unit__serial_number")
+        .values_list(f"{fk}_id", "printer_unit__printer_model__name", "printer_unit__serial_number",
+                     *(["scrapped"] if units_model is RentalReturnUnit else []))
+    )
+    items = {}
+    for challan_id, model_name, serial, *scrapped in rows:
+        label = (serial or "-") + (" (SCRAPPED)" if scrapped and scrapped[0] else "")
+        items.setdefault(challan_id, {}).setdefault(model_name, []).append(label)
+    return [(challan, list(items.get(challan.pk, {}).items())) for challan in challans]
+
+
+def render_challans(model, loaded):
+    """Draw every (challan, items) pair from `load_challans` into one PDF and return its bytes."""
+    _, _, heading, note = CHALLAN_KINDS[model]
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=A4, pageCompression=1, invariant=1)
+    for challan, items in loaded:
+        canvas.setTitle(f"Challan no {challan.challan_no}")
+        draw_challan(canvas, challan, items, heading, note)
+    canvas.save()
+    return buffer.getvalue()
+
+
+def challan_pdf(model, pk):
+    """(filename, PDF bytes) of one challan, from the cache when nothing it prints has changed since."""
+    key = challan_cache_key(model, pk)
+    if (cached := cache.get(key)) is None:
+        loaded = load_challans(model.objects.filter(pk=pk))
+        if not loaded:
+            raise model.DoesNotExist()
+        cached = (f"{loaded[0][0].challan_no}.pdf".replace("/", "-"), render_challans(model, loaded))
+        cache.set(key, cached, settings.CHALLAN_CACHE_TIMEOUT)
+    return cached
+
+
+@memoize
+def logo():
+    # The source image is ~0.5 MB; embed a copy sized for 300 dpi instead
+    if not LOGO.exists():
+        return None
+    image = Image.open(LOGO)
+    image.thumbnail((LOGO_SIZE[0] * 300 // 72, LOGO_SIZE[1] * 300 // 72))
+    return ImageReader(image)
+
+
+def dotted_value(canvas, x, y, end, value, font="Courier-Bold", size=10.5):
+    canvas.setFont(font, size)
+    canvas.drawString(x + 4, y, value)
+    canvas.saveState()
+    canvas.setDash(1, 2)
+    canvas.setLineWidth(1)
+    canvas.line(x, y - 3, end, y - 3)
+    canvas.restoreState()
+
+
+def draw_header(canvas, challan, heading, note):
+    """Draw everything above the item rows and return the y where the table body starts."""
+    canvas.setFont("Helvetica-Bold", 18)
+    canvas.drawCentredString(PAGE_WIDTH / 2, TOP - 16, heading)
+
+    box_top, box_height = TOP - 26, 75
+    company_width = 301
+    canvas.setLineWidth(1.5)
+    canvas.roundRect(LEFT, box_top - box_height, company_width, box_height, 9)
+    canvas.roundRect(LEFT + company_width + 13.5, box_top - box_height, RIGHT - LEFT - company_width - 13.5, box_height, 9)
+    if image := logo():
+        canvas.drawImage(image, LEFT + 11, box_top - 59, *LOGO_SIZE, mask="auto")
+    text_x = LEFT + 59
+    canvas.setFont("Helvetica-Bold", 15)
+    canvas.drawString(text_x, box_top - 24, COMPANY_NAME)
+    canvas.setFont("Helvetica-Bold", 10.5)
+    canvas.drawString(text_x, box_top - 40, COMPANY_ADDRESS)
+    canvas.drawString(text_x, box_top - 56, COMPANY_MOBILE)
+
+    info_x = LEFT + company_width + 20
+    fields = [
+        ("Challan No.", challan.challan_no),
+        ("Date.", challan.challan_date.strftime("%d-%m-%Y")),
+        ("Order No.", challan.order_no or ""),
+        ("Date.", challan.order_date.strftime("%d-%m-%Y") if challan.order_date else ""),
+    ]
+    for i, (label, value) in enumerate(fields):
+        y = box_top - 16 - i * 17
+        canvas.setFont("Helvetica", 11)
+        canvas.drawString(info_x, y, label)
+        dotted_value(canvas, info_x + canvas.stringWidth(label, "Helvetica", 11) + 4, y, RIGHT - 8, value, size=10)
+
+    y = box_top - box_height - 22
+    address = challan.customer_address
+    for label, value in (("To", address.customer.name), ("Add", address.address)):
+        canvas.setFont("Helvetica-Bold", 11)
+        canvas.drawString(LEFT, y, label)
+        start = LEFT + canvas.stringWidth(label, "Helvetica-Bold", 11) + 8
+        lines = simpleSplit(value, "Courier-Bold", 11, RIGHT - start - 4) or [""]
+        for line in lines[:2]:
+            dotted_value(canvas, start, y, RIGHT, line, size=11)
+            y -= 18
+        y -= 4
+
+    canvas.setFont("Helvetica-Bold", 12)
+    note_width = canvas.stringWidth(note, "Helvetica-Bold", 12) + 24
+    canvas.setLineWidth(1.5)
+    canvas.roundRect((PAGE_WIDTH - note_width) / 2, y - 5, note_width, 17, 2)
+    canvas.drawCentredString(PAGE_WIDTH / 2, y, note)
+
+    y -= 14
+    canvas.setLineWidth(0.75)
+    canvas.rect(LEFT, y - 20, RIGHT - LEFT, 20)
+    canvas.setFont("Helvetica-Bold", 10.5)
+    x = LEFT
+    for title, share in COLUMNS:
+        width = share * (RIGHT - LEFT)
+        canvas.drawCentredString(x + width / 2, y - 14, title)
+        x += width
+    return y - 20
+
+
+def draw_table_frame(canvas, top, bottom):
+    canvas.setLineWidth(0.75)
+    canvas.rect(LEFT, bottom, RIGHT - LEFT, top - bottom)
+    x = LEFT
+    for _, share in COLUMNS[:-1]:
+        x += share * (RIGHT - LEFT)
+        canvas.line(x, top + 20, x, bottom)
+
+
+def draw_footer(canvas):
+    y = BOTTOM + FOOTER_HEIGHT - 20
+    canvas.setFont("Helvetica-Bold", 10)
+    canvas.drawString(LEFT, y, "Received By")
+    dotted_value(canvas, LEFT + 66, y, LEFT + 300, "")
+    y -= 22
+    canvas.setFont("Helvetica-Bold", 10)
+    canvas.drawString(LEFT, y, "Date")
+    dotted_value(canvas, LEFT + 30, y, LEFT + 300, "")
+    canvas.setFont("Helvetica-Bold", 10)
+    canvas.drawRightString(RIGHT - 8, y, "Signature")
+    y -= 12
+    canvas.setLineWidth(0.75)
+    canvas.line(LEFT, y, RIGHT, y)
+    canvas.setFont("Helvetica-Bold", 11.5)
+    canvas.drawString(LEFT, y - 12, "DEALS IN :")
+    canvas.setFont("Helvetica-Bold", 9)
+    canvas.drawString(LEFT + canvas.stringWidth("DEALS IN : ", "Helvetica-Bold", 11.5), y - 12, TAGLINE)
+
+
+def draw_challan(canvas, challan, items, heading, note):
+    """Draw one challan, continuing the item table onto further pages when it does not fit on one."""
+    widths = [share * (RIGHT - LEFT) for _, share in COLUMNS]
+    description_x = LEFT + widths[0] + widths[1] + 5
+    description_width = widths[2] - 10
+    rows = [
+        (str(i), str(len(serials)), [model_name] + [
+            "    " + line for line in simpleSplit(
+                "SERIAL NO - " + " / ".join(serials), "Helvetica", 10, description_width - 16)
+        ])
+        for i, (model_name, serials) in enumerate(items, 1)
+    ]
+    rows += [("", "", ["Along With USB & Power Cable"]), ("", "", ["(Returnable Item Not for Sale)"])]
+
+    table_bottom = BOTTOM + FOOTER_HEIGHT
+    top = y = draw_header(canvas, challan, heading, note)
+    for sl, qty, lines in rows:
+        line_no = 0
+        while line_no < len(lines):
+            if y - LINE - 5 < table_bottom:
+                draw_table_frame(canvas, top, table_bottom)
+                draw_footer(canvas)
+                canvas.showPage()
+                top = y = draw_header(canvas, challan, heading, note)
+            canvas.setFont("Helvetica", 10)
+            if line_no == 0:
+                canvas.drawCentredString(LEFT + widths[0] / 2, y - LINE, sl)
+                canvas.drawCentredString(LEFT + widths[0] + widths[1] / 2, y - LINE, qty)
+            canvas.drawString(description_x, y - LINE, lines[line_no])
+            y -= LINE
+            line_no += 1
+        y -= 5
+    draw_table_frame(canvas, top, table_bottom)
+    draw_footer(canvas)
+    canvas.showPage()
@@ -0,0 +1,105 @@
+"""
+Synthetic fleet for benchmarks and query-count tests: masters, monthly purchases, and rentals and returns spread
+over the years before `end`. Documents go through the model methods, so challan numbers, unit status and the
+inventory snapshot stay as consistent as real usage would leave them. Output is deterministic for a given seed.
+"""
+import random
+from datetime import date, timedelta
+from django.db.transaction import atomic
+from .cache import bump_version
+from .models import (
+    Customer, CustomerAddress, PrinterModel, PrinterUnit, Purchase, PurchaseItem, Rental, RentalReturn, Store, Vendor,
+)
+
+
+def month_starts(end, months):
+    first = end.replace(day=1)
+    starts = []
+    for _ in range(months):
+        starts.append(first)
+        first = (first - timedelta(days=1)).replace(day=1)
+    return starts[::-1]
+
+
+def bulk_named(model, label, count, **fields):
+    """Create `count` rows of `model` named after `label`, numbered on from the rows already there."""
+    offset = model.objects.count()
+    names = [f"{label} {offset + i + 1}" for i in range(count)]
+    model.objects.bulk_create(model(name=name, **fields) for name in names)
+    bump_version(model)
+    # Re-read: MySQL does not return primary keys from a bulk insert
+    return list(model.objects.filter(name__in=names).order_by("pk"))
+
+
+@atomic
+def generate_fleet(customers=2000, units=100000, years=3, printer_models=40, stores=5, vendors=20,
+                   rentals_per_month=60, return_rate=0.4, scrap_rate=0.05, seed=0, end=None):
+    """Seed a fleet and return how many rows of each kind were added."""
+    rng = random.Random(seed)
+    end = end or date.today()
+    months = month_starts(end, years * 12)
+    store_rows = bulk_named(Store, "Fixture Store", stores, address="Fixture Road")
+    vendor_rows = bulk_named(Vendor, "Fixture Vendor", vendors, address="Fixture Road", mobile="9000000000")
+    model_rows = bulk_named(PrinterModel, "Fixture Model", printer_models)
+    customer_rows = bulk_named(Customer, "Fixture Customer", customers)
+    CustomerAddress.objects.bulk_create(
+        CustomerAddress(customer=customer, address=f"Site {i + 1}, {customer.name}", mobile="9000000000")
+        for customer in customer_rows for i in range(rng.randint(1, 3))
+    )
+    bump_version(CustomerAddress)
+    address_rows = list(CustomerAddress.objects.filter(customer__in=customer_rows).order_by("pk"))
+
+    serial_offset = PrinterUnit.objects.count()
+    in_store = {store.pk: [] for store in store_rows}
+    on_rent = {}
+    counts = dict.fromkeys(["purchases", "rentals", "rental_returns"], 0)
+    for month_no, month in enumerate(months):
+        store = store_rows[month_no % len(store_rows)]
+        month_units = units // len(months) + (month_no < units % len(months))
+        if month_units:
+            purchase = Purchase.objects.create(vendor=rng.choice(vendor_rows), store=store, date=month)
+            counts["purchases"] += 1
+            picked = rng.sample(model_rows, min(len(model_rows), max(1, month_units // 50)))
+            for i, printer_model in enumerate(picked):
+                quantity = month_units // len(picked) + (i < month_units % len(picked))
+                serials = [f"FX{serial_offset + n:07d}" for n in range(1, quantity + 1)]
+                serial_offset += quantity
+                item = PurchaseItem(purchase=purchase, printer_model=printer_model, quantity=quantity)
+                item.save(serial_numbers=serials)
+                in_store[store.pk].extend(item.purchased_printer_units.values_list("pk", flat=True))
+
+        days = ((month + timedelta(days=31)).replace(day=1) - month).days
+        for _ in range(rentals_per_month):
+            store = rng.choice(store_rows)
+            if not in_store[store.pk]:
+                continue
+            challan_date = month + timedelta(days=rng.randrange(days))
+            address = rng.choice(address_rows)
+            pool = in_store[store.pk]
+            taken = [pool.pop(rng.randrange(len(pool))) for _ in range(min(len(pool), rng.randint(1, 30)))]
+            rental = Rental.objects.create(challan_date=challan_date, order_date=challan_date,
+                                           order_no=f"PO-{rng.randint(1000, 9999)}", store=store,
+                                           customer_address=address)
+            rental.add_units(taken)
+            rental.approved = True
+            rental.save()
+            on_rent.setdefault(address.pk, (address, []))[1].extend(taken)
+            counts["rentals"] += 1
+
+            if rng.random() < return_rate:
+                address, rented = on_rent[rng.choice(list(on_rent))]
+                returned = [rented.pop(rng.randrange(len(rented))) for _ in range(rng.randint(0, len(rented)))]
+                if not returned:
+                    continue
+                store = rng.choice(store_rows)
+                rental_return = RentalReturn.objects.create(
+                    challan_date=challan_date, order_date=challan_date, customer_address=address, store=store)
+                returns = {pk: rng.random() < scrap_rate for pk in returned}
+                rental_return.return_units(returns)
+                in_store[store.pk].extend(pk for pk, scrapped in returns.items() if not scrapped)
+                counts["rental_returns"] += 1
+
+    return {
+        "stores": len(store_rows), "vendors": len(vendor_rows), "printer_models": len(model_rows),
+        "customers": len(customer_rows), "customer_addresses": len(address_rows), "printer_units": units, **counts,
+    }
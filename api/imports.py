@@ -0,0 +1,249 @@
+"""
+Bulk CSV/XLSX import of master data and printer units. Rows stream from the file, are validated one by one with
+foreign keys resolved by name from in-memory maps, and are written in chunked bulk inserts that skip or upsert rows
+whose unique key already exists. Invalid rows are reported by line number and never block the valid ones.
+"""
+import csv
+import io
+import re
+import zipfile
+from collections import Counter
+from xml.etree.ElementTree import iterparse
+from django.db import IntegrityError, connection
+from django.db.transaction import atomic
+from .cache import bump_version
+from .models import (
+    Customer, CustomerAddress, InventorySnapshot, PrinterModel, PrinterUnit, Store, Vendor, normalize_serial,
+)
+
+IMPORT_FORMATS = ("csv", "xlsx")
+IMPORT_CHUNK_SIZE = 2000
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+class ImportKind:
+    """
+    How rows of one file map onto `model`: its `columns` (FK columns named in `lookups` hold the related row's name),
+    the unique `key` that decides conflicts, and the `update` fields an existing row takes from the file. Kinds
+    without `update` fields skip rows that already exist.
+    """
+
+    def __init__(self, model, columns, key, required, update=(), lookups=None, defaults=None):
+        self.model = model
+        self.columns = columns
+        self.key = key
+        self.required = required
+        self.update = update
+        self.lookups = lookups or {}
+        self.defaults = defaults or {}
+
+    def attname(self, column):
+        return f"{column}_id" if column in self.lookups else column
+
+
+IMPORT_KINDS = {
+    "printer-model": ImportKind(PrinterModel, ["name"], key=["name"], required=["name"]),
+    "vendor": ImportKind(Vendor, ["name", "address", "mobile"], key=["name"], required=["name", "address", "mobile"],
+                         update=["address", "mobile"]),
+    "customer": ImportKind(Customer, ["name"], key=["name"], required=["name"]),
+    "customer-address": ImportKind(CustomerAddress, ["customer", "address", "mobile"], key=["customer", "address"],
+                                   required=["customer", "address"], update=["mobile"], lookups={"customer": Customer}),
+    "printer-unit": ImportKind(PrinterUnit, ["serial_number", "printer_model", "store"], key=["serial_number"],
+                               required=["serial_number", "printer_model", "store"],
+                               lookups={"printer_model": PrinterModel, "store": Store},
+                               defaults={"status": PrinterUnit.STATUS_INSTORE}),
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.skipped = []  # line numbers of rows that already existed
+        self.errors = []  # (line number, message)
+
+    def as_dict(self):
+        return {
+            "created": self.created, "updated": self.updated, "skipped": len(self.skipped),
+            "skipped_rows": self.skipped,
+            "errors": [{"row": row, "error": error} for row, error in self.errors],
+        }
+
+
+def import_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise ValueError(f"Expected a .csv or .xlsx file, got {filename!r}.")
+    return extension
+
+
+def csv_rows(file):
+    yield from csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+
+
+def column_index(ref):
+    index = 0
+    for letter in re.match("[A-Z]+", ref).group():
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def xlsx_rows(file):
+    """Cell text of the first worksheet, row by row, without loading the workbook."""
+    with zipfile.ZipFile(file) as archive:
+        shared = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            for _, element in iterparse(archive.open("xl/sharedStrings.xml")):
+                if element.tag == f"{XLSX_NS}si":
+                    shared.append("".join(t.text or "" for t in element.iter(f"{XLSX_NS}t")))
+                    element.clear()
+        _, workbook = next(e for e in iterparse(archive.open("xl/workbook.xml")) if e[1].tag == f"{XLSX_NS}sheet")
+        rel_id = workbook.get(f"{REL_NS}id")
+        _, rel = next(e for e in iterparse(archive.open("xl/_rels/workbook.xml.rels")) if e[1].get("Id") == rel_id)
+        target = rel.get("Target")
+        sheet = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+
+        for _, element in iterparse(archive.open(sheet)):
+            if element.tag != f"{XLSX_NS}row":
+                continue
+            values = []
+            for cell in element.iter(f"{XLSX_NS}c"):
+                if ref := cell.get("r"):
+                    values += [""] * (column_index(ref) - len(values))
+                kind = cell.get("t")
+                if kind == "s":
+                    value = shared[int(cell.findtext(f"{XLSX_NS}v"))]
+                elif kind == "inlineStr":
+                    value = "".join(t.text or "" for t in cell.iter(f"{XLSX_NS}t"))
+                else:
+                    value = cell.findtext(f"{XLSX_NS}v") or ""
+                    if kind in (None, "n") and value.endswith(".0"):
+                        value = value[:-2]
+                values.append(value)
+            yield values
+            element.clear()
+
+
+def name_map(model):
+    return {name.casefold(): pk for pk, name in model.objects.values_list("pk", "name")}
+
+
+def key_of(kind, values):
+    # Unique columns compare case-insensitively, as under MySQL's default collation
+    return tuple(str(values[kind.attname(c)]).casefold() for c in kind.key)
+
+
+def build_row(kind, record, lookups):
+    """Model field values for one file row, or the message explaining why it is invalid."""
+    values = dict(kind.defaults)
+    for column in kind.columns:
+        raw = (record.get(column) or "").strip()
+        if not raw:
+            if column in kind.required:
+                return f"{column} is required."
+            values[kind.attname(column)] = None
+        elif column in kind.lookups:
+            if (pk := lookups[column].get(raw.casefold())) is None:
+                return f"Unknown {column.replace('_', ' ')} {raw!r}."
+            values[kind.attname(column)] = pk
+        else:
+            max_length = kind.model._meta.get_field(column).max_length
+            if max_length and len(raw) > max_length:
+                return f"{column} is longer than {max_length} characters."
+            values[column] = raw
+    return values
+
+
+def existing_keys(kind, chunk):
+    first = kind.attname(kind.key[0])
+    return {
+        key_of(kind, row) for row in
+        kind.model.objects.filter(**{f"{first}__in": {values[first] for _, values in chunk}}).values(
+            *(kind.attname(c) for c in kind.key))
+    }
+
+
+def insert_rows(model, rows):
+    """
+    Insert `rows` ((line, values)) and return (inserted, conflicting). A key that turned up after it was checked, from a
+    concurrent import or a collation comparing differently, sends the chunk down a row-at-a-time path to find it.
+    """
+    try:
+        with atomic():
+            model.objects.bulk_create([model(**values) for _, values in rows])
+        return rows, []
+    except IntegrityError:
+        inserted, conflicting = [], []
+        for line, values in rows:
+            try:
+                with atomic():
+                    model.objects.bulk_create([model(**values)])
+                inserted.append((line, values))
+            except IntegrityError:
+                conflicting.append((line, values))
+        return inserted, conflicting
+
+
+def save_chunk(kind, chunk, report):
+    """Write one chunk of (line, values) rows: insert new keys and skip or upsert existing ones."""
+    model = kind.model
+    existing = existing_keys(kind, chunk)
+    new, old = [], []
+    for line, values in chunk:
+        (old if key_of(kind, values) in existing else new).append((line, values))
+
+    with atomic():
+        if kind.update:
+            # MySQL upserts on whichever unique key conflicts and rejects an explicit target
+            target = kind.key if connection.features.supports_update_conflicts_with_target else None
+            model.objects.bulk_create([model(**values) for _, values in chunk], update_conflicts=True,
+                                      unique_fields=target, update_fields=kind.update)
+            report.updated += len(old)
+        else:
+            new, conflicting = insert_rows(model, new)
+            report.skipped += sorted(line for line, _ in old + conflicting)
+        report.created += len(new)
+        if model is PrinterUnit:
+            InventorySnapshot.apply(Counter(
+                (values["printer_model_id"], PrinterUnit.STATUS_INSTORE, values["store_id"], None) for _, values in new
+            ))
+
+
+def import_rows(kind_name, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import `rows` (lists of cell text, header first) as `kind_name` and return an ImportReport."""
+    kind = IMPORT_KINDS[kind_name]
+    rows = iter(rows)
+    header = [str(h).strip().lower().replace(" ", "_") for h in next(rows, [])]
+    if missing := [c for c in kind.required if c not in header]:
+        raise ValueError(f"Missing columns: {', '.join(missing)}.")
+    lookups = {column: name_map(model) for column, model in kind.lookups.items()}
+    report = ImportReport()
+    seen = {}
+    chunk = []
+    for line, cells in enumerate(rows, 2):
+        record = dict(zip(header, cells))
+        if not any((v or "").strip() for v in record.values()):
+            continue
+        values = build_row(kind, record, lookups)
+        if isinstance(values, str):
+            report.errors.append((line, values))
+            continue
+        if kind.model is PrinterUnit:
+            values["serial_number_normalized"] = normalize_serial(values["serial_number"])
+        if (first_line := seen.setdefault(key_of(kind, values), line)) != line:
+            report.errors.append((line, f"Duplicate of row {first_line}."))
+            continue
+        chunk.append((line, values))
+        if len(chunk) == chunk_size:
+            save_chunk(kind, chunk, report)
+            chunk = []
+    if chunk:
+        save_chunk(kind, chunk, report)
+    bump_version(kind.model)
+    return report
+
+
+def import_file(kind_name, file, import_format):
+    rows = xlsx_rows(file) if import_format == "xlsx" else csv_rows(file)
+    return import_rows(kind_name, rows)
@@ -0,0 +1,61 @@
+from time import perf_counter
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic, set_rollback
+from api.models import (
+    Customer, CustomerAddress, PrinterModel, PrinterUnit, Purchase, PurchaseItem, Rental, RentalReturn, Store, Vendor,
+)
+from api.query_plans import KNOWN_PROBLEMS, hot_queries, plan_problems
+
+
+class Command(BaseCommand):
+    help = "Time and EXPLAIN the hot PrinterUnit / Rental / RentalReturn queries on a seeded fleet. Seeded rows are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--units", type=int, default=100000)
+        parser.add_argument("--models", type=int, default=25)
+        parser.add_argument("--stores", type=int, default=5)
+        parser.add_argument("--challans", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with atomic():
+            vendor = Vendor.objects.create(name="Benchmark Vendor", address="-", mobile="-")
+            stores = [Store.objects.create(name=f"Benchmark Store {i}", address="-") for i in range(options["stores"])]
+            printer_models = [PrinterModel.objects.create(name=f"Benchmark Model {i}") for i in range(options["models"])]
+            customer = Customer.objects.create(name="Benchmark Customer")
+            addresses = [CustomerAddress.objects.create(customer=customer, address=f"Site {i}") for i in range(10)]
+
+            per_item = options["units"] // (len(stores) * len(printer_models))
+            for store in stores:
+                purchase = Purchase.objects.create(vendor=vendor, store=store, date=date.today())
+                for printer_model in printer_models:
+                    PurchaseItem.objects.create(purchase=purchase, printer_model=printer_model, quantity=per_item)
+            ids = list(PrinterUnit.objects.order_by("pk").values_list("pk", flat=True))
+            for i, address in enumerate(addresses):
+                PrinterUnit.objects.filter(pk__in=ids[i::30]).update(
+                    status=PrinterUnit.STATUS_RENTED, store=None, customer_address=address)
+
+            start_day = date.today() - timedelta(days=options["challans"] // 10)
+            Rental.objects.bulk_create(
+                Rental(challan_no=f"BENCH/{i}", challan_date=start_day + timedelta(days=i // 10), order_date=start_day,
+                       store=stores[0], customer_address=addresses[i % 10])
+                for i in range(options["challans"]))
+            RentalReturn.objects.bulk_create(
+                RentalReturn(challan_no=f"BENCH/{i}", challan_date=start_day + timedelta(days=i // 10),
+                             store=stores[0], customer_address=addresses[i % 10])
+                for i in range(options["challans"]))
+
+            self.stdout.write(f"{PrinterUnit.objects.count()} units, {options['challans']} challans of each kind")
+            self.stdout.write(f"{'query':<24} {'ms':>8}  plan")
+            queries = hot_queries(stores[0].pk, printer_models[0].pk, addresses[0].pk)
+            for name, queryset in queries.items():
+                timings = []
+                for _ in range(options["repeat"]):
+                    start = perf_counter()
+                    list(queryset.all())
+                    timings.append(perf_counter() - start)
+                problems = plan_problems(queryset)
+                known = " (known)" if problems and problems == KNOWN_PROBLEMS.get(name) else ""
+                self.stdout.write(f"{name:<24} {min(timings) * 1000:>8.2f}  {'; '.join(problems) or 'indexed'}{known}")
+            set_rollback(True)
@@ -0,0 +1,43 @@
+import tracemalloc
+from time import perf_counter
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic, set_rollback
+from api.models import PrinterModel, PrinterUnit, Store, Vendor, Purchase, PurchaseItem
+from api import reports
+
+
+class Command(BaseCommand):
+    help = "Time and memory-profile the inventory_by_status report as the fleet grows. Seeded rows are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+        parser.add_argument("--models", type=int, default=25)
+
+    def handle(self, *args, **options):
+        with atomic():
+            vendor = Vendor.objects.create(name="Benchmark Vendor", address="-", mobile="-")
+            store = Store.objects.create(name="Benchmark Store", address="-")
+            printer_models = [PrinterModel.objects.create(name=f"Benchmark Model {i}") for i in range(options["models"])]
+
+            self.stdout.write(f"{'units':>10} {'rows':>6} {'seconds':>9} {'peak KiB':>9}")
+            seeded = 0
+            for size in sorted(options["sizes"]):
+                purchase = Purchase.objects.create(vendor=vendor, store=store, date=date.today())
+                per_model = (size - seeded) // len(printer_models)
+                for printer_model in printer_models:
+                    PurchaseItem.objects.create(purchase=purchase, printer_model=printer_model, quantity=per_model)
+                new_units = PrinterUnit.objects.filter(purchase_item__purchase=purchase).order_by("pk")
+                ids = list(new_units.values_list("pk", flat=True))
+                PrinterUnit.objects.filter(pk__in=ids[::3]).update(status=PrinterUnit.STATUS_RENTED, store=None)
+                PrinterUnit.objects.filter(pk__in=ids[1::10]).update(status=PrinterUnit.STATUS_SCRAPPED, store=None)
+                seeded += len(ids)
+
+                tracemalloc.start()
+                start = perf_counter()
+                rows = reports.inventory_by_status()
+                elapsed = perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(f"{seeded:>10} {len(rows):>6} {elapsed:>9.3f} {peak / 1024:>9.1f}")
+            set_rollback(True)
@@ -0,0 +1,31 @@
+from time import perf_counter
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.transaction import atomic, set_rollback
+from django.test.utils import CaptureQueriesContext
+from api.models import PrinterModel, Store, Vendor, Purchase, PurchaseItem
+
+
+class Command(BaseCommand):
+    help = "Time PurchaseItem unit materialization for growing quantities. Every run is rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--quantities", nargs="+", type=int, default=[10, 1000, 10000])
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'quantity':>10} {'seconds':>10} {'queries':>8} {'units/s':>10}")
+        for quantity in options["quantities"]:
+            with atomic():
+                vendor = Vendor.objects.create(name="Benchmark Vendor", address="-", mobile="-")
+                store = Store.objects.create(name="Benchmark Store", address="-")
+                printer_model = PrinterModel.objects.create(name="Benchmark Model")
+                purchase = Purchase.objects.create(vendor=vendor, store=store, date=date.today())
+
+                with CaptureQueriesContext(connection) as queries:
+                    start = perf_counter()
+                    PurchaseItem.objects.create(purchase=purchase, printer_model=printer_model, quantity=quantity)
+                    elapsed = perf_counter() - start
+
+                set_rollback(True)
+            self.stdout.write(f"{quantity:>10} {elapsed:>10.3f} {len(queries):>8} {quantity / elapsed:>10.0f}")
@@ -0,0 +1,40 @@
+from time import perf_counter
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic, set_rollback
+from rest_framework.test import APIRequestFactory, force_authenticate
+from api.models import PrinterModel, PrinterUnit, Store, Vendor, Purchase, PurchaseItem
+from api.views import get_generic_viewset
+
+
+class Command(BaseCommand):
+    help = "Time the /api/printer-unit/ list action per serialized row. Seeded rows are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--units", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        units, repeat = options["units"], options["repeat"]
+        view = get_generic_viewset(PrinterUnit).as_view({"get": "list"})
+        with atomic():
+            user = User.objects.create_user("benchmark-serializer")
+            vendor = Vendor.objects.create(name="Benchmark Vendor", address="-", mobile="-")
+            store = Store.objects.create(name="Benchmark Store", address="-")
+            printer_model = PrinterModel.objects.create(name="Benchmark Model")
+            purchase = Purchase.objects.create(vendor=vendor, store=store, date=date.today())
+            PurchaseItem.objects.create(purchase=purchase, printer_model=printer_model, quantity=units)
+
+            rows = PrinterUnit.objects.count()
+            timings = []
+            for _ in range(repeat):
+                request = APIRequestFactory().get("/api/printer-unit/")
+                force_authenticate(request, user=user)
+                start = perf_counter()
+                view(request).render()
+                timings.append(perf_counter() - start)
+            set_rollback(True)
+
+        best = min(timings)
+        self.stdout.write(f"{rows} rows: best {best:.3f}s, {best / rows * 1e6:.1f}us per row")
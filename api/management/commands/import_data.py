@@ -0,0 +1,38 @@
+import csv
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError
+from api.imports import IMPORT_KINDS, import_file, import_format
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import a CSV or XLSX file. Columns are the model's field names; foreign keys (customer, printer_model, "
+        "store) are given by name. Valid rows are imported even when others fail."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORT_KINDS))
+        parser.add_argument("path")
+        parser.add_argument("--errors", help="Write the per-row error report to this CSV file instead of stderr.")
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        try:
+            with open(options["path"], "rb") as file:
+                report = import_file(options["kind"], file, import_format(options["path"]))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        elapsed = perf_counter() - start
+
+        if options["errors"]:
+            with open(options["errors"], "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["row", "error"])
+                writer.writerows(report.errors)
+        else:
+            for row, error in report.errors:
+                self.stderr.write(f"row {row}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.created} created, {report.updated} updated, {len(report.skipped)} already existed, "
+            f"{len(report.errors)} invalid in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,91 @@
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from time import perf_counter
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+# (sync path served by WSGI, async twin served by ASGI)
+ENDPOINTS = [
+    ("/api/custom/printer-unit/?limit=100", "/api/async/custom/printer-unit/?limit=100"),
+    ("/api/printer-model/", "/api/async/printer-model/"),
+    ("/api/reports/inventory-by-status/", "/api/async/reports/inventory-by-status/"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare read throughput of the sync API under WSGI with its async twins under ASGI. Start both servers "
+        "against the same database first, e.g. `gunicorn djangoProject.wsgi -w 4 -b :8000` and "
+        "`uvicorn djangoProject.asgi:application --workers 4 --port 8001`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wsgi", default="http://127.0.0.1:8000")
+        parser.add_argument("--asgi", default="http://127.0.0.1:8001")
+        parser.add_argument("--concurrency", nargs="+", type=int, default=[50, 200])
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint and concurrency level.")
+        parser.add_argument("--username", required=True, help="Existing user the requests are authenticated as.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}.")
+        session = SessionStore()
+        session.update({
+            SESSION_KEY: str(user.pk),
+            BACKEND_SESSION_KEY: settings.AUTHENTICATION_BACKENDS[0],
+            HASH_SESSION_KEY: user.get_session_auth_hash(),
+        })
+        session.create()
+        cookie = f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+        try:
+            self.stdout.write(f"{'server':<6} {'path':<42} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+            for concurrency in options["concurrency"]:
+                for sync_path, async_path in ENDPOINTS:
+                    for server, path in (("wsgi", options["wsgi"] + sync_path), ("asgi", options["asgi"] + async_path)):
+                        rate, p50, p95, errors = self.run_load(path, cookie, concurrency, options["requests"])
+                        self.stdout.write(
+                            f"{server:<6} {urlsplit(path).path:<42} {concurrency:>5} {rate:>8.1f} "
+                            f"{p50 * 1000:>8.1f} {p95 * 1000:>8.1f} {errors:>6}")
+        finally:
+            session.delete()
+
+    def run_load(self, url, cookie, concurrency, total):
+        parts = urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        per_worker = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+
+        def worker(count):
+            # One keep-alive connection per simulated client
+            timings, errors = [], 0
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            for _ in range(count):
+                start = perf_counter()
+                try:
+                    conn.request("GET", target, headers={"Cookie": cookie})
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        errors += 1
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+                timings.append(perf_counter() - start)
+            conn.close()
+            return timings, errors
+
+        start = perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(worker, per_worker))
+        elapsed = perf_counter() - start
+        timings = sorted(t for worker_timings, _ in results for t in worker_timings)
+        cuts = quantiles(timings, n=20)
+        return len(timings) / elapsed, cuts[9], cuts[18], sum(errors for _, errors in results)
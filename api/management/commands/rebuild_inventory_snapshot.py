@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import InventorySnapshot
+
+
+class Command(BaseCommand):
+    help = "Rebuild the inventory snapshot from printer_unit and verify the two agree."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify-only", action="store_true", help="Compare without rebuilding.")
+
+    def handle(self, *args, **options):
+        if not options["verify_only"]:
+            InventorySnapshot.rebuild()
+            self.stdout.write("Rebuilt inventory snapshot.")
+
+        live, snapshot = InventorySnapshot.live_counts(), InventorySnapshot.snapshot_counts()
+        mismatches = {key: (live.get(key, 0), snapshot.get(key, 0)) for key in live.keys() | snapshot.keys()
+                      if live.get(key, 0) != snapshot.get(key, 0)}
+        for key, (expected, actual) in sorted(mismatches.items(), key=repr):
+            self.stderr.write(f"{dict(zip(InventorySnapshot.KEY_FIELDS, key))}: live {expected}, snapshot {actual}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} snapshot groups differ from printer_unit.")
+        self.stdout.write(self.style.SUCCESS(f"Snapshot matches printer_unit ({len(live)} groups)."))
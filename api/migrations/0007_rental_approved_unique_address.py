@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_alter_customeraddress_mobile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rental',
+            name='approved',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='customeraddress',
+            name='address',
+            field=models.CharField(max_length=500),
+        ),
+        migrations.AddConstraint(
+            model_name='customeraddress',
+            constraint=models.UniqueConstraint(fields=('customer', 'address'), name='unique_address_per_customer'),
+        ),
+    ]
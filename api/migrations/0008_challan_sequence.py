@@ -0,0 +1,47 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    # Continue numbering after the highest existing challan of each document type and "yy-yy" year.
+    ChallanSequence = apps.get_model('api', 'ChallanSequence')
+    for model_name in ('Purchase', 'Rental', 'RentalReturn'):
+        model = apps.get_model('api', model_name)
+        last_values = {}
+        for challan_no in model.objects.exclude(challan_no=None).values_list('challan_no', flat=True):
+            try:
+                _, seq, years = challan_no.split('/')
+                year, seq = 2000 + int(years[:2]), int(seq)
+            except ValueError:
+                continue
+            last_values[year] = max(last_values.get(year, 0), seq)
+        ChallanSequence.objects.bulk_create(
+            ChallanSequence(doc_type=model._meta.db_table, year=year, last_value=last_value)
+            for year, last_value in last_values.items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_rental_approved_unique_address'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChallanSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(max_length=50)),
+                ('year', models.PositiveIntegerField()),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'challan_sequences',
+                'db_table': 'challan_sequence',
+                'constraints': [models.UniqueConstraint(fields=('doc_type', 'year'), name='unique_sequence_per_doc_type_year')],
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_snapshot(apps, schema_editor):
+    PrinterUnit = apps.get_model('api', 'PrinterUnit')
+    InventorySnapshot = apps.get_model('api', 'InventorySnapshot')
+    key_fields = ('printer_model_id', 'status', 'store_id', 'customer_address_id')
+    InventorySnapshot.objects.bulk_create(
+        InventorySnapshot(**{f: row[f] for f in key_fields}, count=row['count'])
+        for row in PrinterUnit.objects.values(*key_fields).annotate(count=models.Count('id')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_challan_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('INSTORE', 'In-store'), ('RENTED', 'Rented'), ('SCRAPPED', 'Scrapped')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('customer_address', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.customeraddress')),
+                ('printer_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.printermodel')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.store')),
+            ],
+            options={
+                'verbose_name_plural': 'inventory_snapshots',
+                'db_table': 'inventory_snapshot',
+                'indexes': [models.Index(fields=['printer_model', 'status', 'store', 'customer_address'], name='inventory_snapshot_key')],
+            },
+        ),
+        migrations.RunPython(populate_snapshot, migrations.RunPython.noop),
+    ]
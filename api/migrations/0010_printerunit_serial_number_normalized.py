@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:11
+
+import re
+from django.db import migrations, models
+
+
+def backfill_normalized(apps, schema_editor):
+    PrinterUnit = apps.get_model('api', 'PrinterUnit')
+    units = PrinterUnit.objects.exclude(serial_number=None).only('id', 'serial_number').order_by('id')
+    batch = []
+    for unit in units.iterator(chunk_size=2000):
+        unit.serial_number_normalized = re.sub(r'[^0-9A-Z]', '', unit.serial_number.upper()) or None
+        batch.append(unit)
+        if len(batch) == 2000:
+            PrinterUnit.objects.bulk_update(batch, ['serial_number_normalized'])
+            batch = []
+    PrinterUnit.objects.bulk_update(batch, ['serial_number_normalized'])
+
+
+def add_ngram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE printer_unit ADD FULLTEXT INDEX printer_unit_serial_ngram (serial_number_normalized) WITH PARSER ngram'
+        )
+
+
+def drop_ngram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE printer_unit DROP INDEX printer_unit_serial_ngram')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_inventory_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printerunit',
+            name='serial_number_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=200, null=True),
+        ),
+        migrations.RunPython(backfill_normalized, migrations.RunPython.noop),
+        migrations.RunPython(add_ngram_index, drop_ngram_index),
+    ]
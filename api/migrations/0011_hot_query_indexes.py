@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_printerunit_serial_number_normalized'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='printerunit',
+            index=models.Index(fields=['status'], name='printer_unit_status'),
+        ),
+        migrations.AddIndex(
+            model_name='printerunit',
+            index=models.Index(fields=['store', 'printer_model', 'status'], name='printer_unit_picker'),
+        ),
+        migrations.AddIndex(
+            model_name='printerunit',
+            index=models.Index(fields=['customer_address', 'status'], name='printer_unit_rented_at'),
+        ),
+        migrations.AddIndex(
+            model_name='printerunit',
+            index=models.Index(fields=['printer_model', 'status'], name='printer_unit_model_status'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['challan_date', 'id'], name='rental_challan_date'),
+        ),
+        migrations.AddIndex(
+            model_name='rentalreturn',
+            index=models.Index(fields=['challan_date', 'id'], name='rental_return_challan_date'),
+        ),
+    ]
@@ -1,6 +1,12 @@
+import re
+from collections import Counter
+from django.db import IntegrityError, connection
 from django.db.transaction import atomic
-from django.db.models import Model, CharField, DateField, ForeignKey, PositiveIntegerField, CASCADE, PROTECT, SET_NULL, BooleanField, UniqueConstraint
+from django.db.models import Model, CharField, DateField, ForeignKey, PositiveIntegerField, IntegerField, CASCADE, PROTECT, SET_NULL, BooleanField, UniqueConstraint, Index, F, Count, Sum
+from .cache import bump_object_version, bump_version
 
+# Rows per INSERT when materializing printer units in bulk.
+UNIT_BATCH_SIZE = 1000
 
 def generate_challan(prefix_name, seq, year):
     initials = ''.join(w[0] for w in prefix_name.split()[:4]).upper()
@@ -8,6 +14,50 @@ def generate_challan(prefix_name, seq, year):
     return f"{initials}/{seq:03d}/{y:02d}-{y+1:02d}"
 
 
+def normalize_serial(serial_number):
+    """Uppercase alphanumerics only, so "ab-12 3" and "AB123" index and match alike."""
+    return re.sub(r"[^0-9A-Z]", "", (serial_number or "").upper()) or None
+
+
+class ChallanSequence(Model):
+    doc_type = CharField(max_length=50)
+    year = PositiveIntegerField()
+    last_value = PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "challan_sequence"
+        verbose_name_plural = "challan_sequences"
+        constraints = [
+            UniqueConstraint(
+                fields=["doc_type", "year"],
+                name="unique_sequence_per_doc_type_year"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.doc_type} {self.year}: {self.last_value}"
+
+    @classmethod
+    def next_value(cls, doc_type, year):
+        """
+        Bump and return the counter for (doc_type, year). Only that one row is locked, until the
+        caller's transaction ends, so a rolled-back document gives its number back instead of leaving a gap.
+        """
+        with atomic():
+            sequence = cls.objects.filter(doc_type=doc_type, year=year)
+            # A year's first document creates its row before anything is locked: a locking read of a missing
+            # row takes an InnoDB gap lock, and two such locks followed by two inserts deadlock
+            if not sequence.exists():
+                try:
+                    with atomic():
+                        cls.objects.create(doc_type=doc_type, year=year)
+                except IntegrityError:
+                    pass  # created by a concurrent first document; the locked read below sees it
+            value = sequence.select_for_update().values_list("last_value", flat=True).get() + 1
+            sequence.update(last_value=value)
+            return value
+
+
 class PrinterModel(Model):
     name = CharField(max_length=300, unique=True)
 
@@ -54,6 +104,20 @@ class Customer(Model):
         db_table = "customer"
         verbose_name_plural = "customers"
 
+    def upsert_addresses(self, addresses):
+        """
+        Insert or update `addresses` ([(address, mobile)]) in one statement, matching existing rows on
+        unique_address_per_customer, and return them. A repeated address keeps its last mobile.
+        """
+        rows = {address: CustomerAddress(customer=self, address=address, mobile=mobile) for address, mobile in addresses}
+        # MySQL upserts on whichever unique key conflicts and rejects an explicit target
+        target = ["customer", "address"] if connection.features.supports_update_conflicts_with_target else None
+        with atomic():
+            CustomerAddress.objects.bulk_create(
+                rows.values(), update_conflicts=True, unique_fields=target, update_fields=["mobile"])
+            bump_version(CustomerAddress)
+            return list(self.addresses.filter(address__in=rows).order_by("pk"))
+
 
 class CustomerAddress(Model):
     customer = ForeignKey(Customer, on_delete=CASCADE, related_name="addresses")
@@ -92,8 +156,7 @@ class Purchase(Model):
             return super().save(*args, **kwargs)
         with atomic():
             year = self.date.year
-            last = Purchase.objects.select_for_update().filter(date__year=year).order_by('-id').first()
-            seq = int(last.challan_no.split('/')[1]) + 1 if last and last.challan_no else 1
+            seq = ChallanSequence.next_value(self._meta.db_table, year)
             self.challan_no = generate_challan(self.vendor.name,seq,year)
             super().save(*args, **kwargs)
 
@@ -111,18 +174,66 @@ class PurchaseItem(Model):
     def __str__(self):
         return f"{self.quantity} x {self.printer_model.name} for Purchase - {self.purchase.challan_no}"
     
-    def save(self, *args, **kwargs):
+    def save(self, *args, serial_numbers=None, **kwargs):
         creating = self.pk is None
         with atomic():
             super().save(*args, **kwargs)
             if creating:
-                for _ in range(self.quantity):
-                    PrinterUnit.objects.create(
-                        printer_model=self.printer_model,
-                        status=PrinterUnit.STATUS_INSTORE,
-                        purchase_item=self,
-                        store=self.purchase.store,
-                    )
+                self.create_units(serial_numbers)
+
+    def create_units(self, serial_numbers=None):
+        """Insert `quantity` in-store units in chunks, assigning `serial_numbers` in order (the rest stay null)."""
+        serial_numbers = [s.strip() or None for s in serial_numbers or []]
+        if len(serial_numbers) > self.quantity:
+            raise ValueError(f"Got {len(serial_numbers)} serial numbers for {self.quantity} units.")
+        serial_numbers += [None] * (self.quantity - len(serial_numbers))
+        store_id = self.purchase.store_id
+        for start in range(0, self.quantity, UNIT_BATCH_SIZE):
+            PrinterUnit.objects.bulk_create([
+                PrinterUnit(
+                    serial_number=serial_number,
+                    serial_number_normalized=normalize_serial(serial_number),
+                    printer_model_id=self.printer_model_id,
+                    status=PrinterUnit.STATUS_INSTORE,
+                    purchase_item=self,
+                    store_id=store_id,
+                )
+                for serial_number in serial_numbers[start:start + UNIT_BATCH_SIZE]
+            ])
+        InventorySnapshot.apply({(self.printer_model_id, PrinterUnit.STATUS_INSTORE, store_id, None): self.quantity})
+        bump_version(PrinterUnit)
+
+    def assign_serials(self, serial_numbers):
+        """
+        Give this item's units that have no serial number yet `serial_numbers`, in unit order, with one uniqueness
+        query and one bulk UPDATE. Returns the updated units.
+        """
+        serial_numbers = [s.strip() for s in serial_numbers if s and s.strip()]
+        if not serial_numbers:
+            raise ValueError("Scan at least one serial number.")
+        seen = Counter(s.upper() for s in serial_numbers)
+        if repeated := sorted(s for s, n in seen.items() if n > 1):
+            raise ValueError(f"Serial numbers scanned more than once: {', '.join(repeated)}.")
+        with atomic():
+            if taken := list(PrinterUnit.objects.filter(serial_number__in=serial_numbers).values_list("serial_number", flat=True)):
+                raise ValueError(f"Serial numbers already in use: {', '.join(sorted(taken))}.")
+            units = list(self.purchased_printer_units.select_for_update().filter(serial_number__isnull=True)
+                         .order_by("pk")[:len(serial_numbers)])
+            if len(units) < len(serial_numbers):
+                raise ValueError(f"Got {len(serial_numbers)} serial numbers for {len(units)} units without one.")
+            for unit, serial_number in zip(units, serial_numbers):
+                unit.serial_number = serial_number
+                unit.serial_number_normalized = normalize_serial(serial_number)
+            PrinterUnit.objects.bulk_update(units, ["serial_number", "serial_number_normalized"], batch_size=UNIT_BATCH_SIZE)
+            bump_version(PrinterUnit)
+            # Units may already be on a challan, which prints their serial numbers
+            unit_ids = [u.pk for u in units]
+            for pk in RentalUnit.objects.filter(printer_unit__in=unit_ids).values_list("rental_id", flat=True).distinct():
+                bump_object_version(Rental, pk)
+            for pk in (RentalReturnUnit.objects.filter(printer_unit__in=unit_ids)
+                       .values_list("rental_return_id", flat=True).distinct()):
+                bump_object_version(RentalReturn, pk)
+        return units
 
 
 class PrinterUnit(Model):
@@ -137,6 +248,7 @@ class PrinterUnit(Model):
     ]
 
     serial_number = CharField(max_length=200, unique=True, blank=True, null=True)
+    serial_number_normalized = CharField(max_length=200, blank=True, null=True, db_index=True, editable=False)
     printer_model = ForeignKey(PrinterModel, on_delete=PROTECT, related_name="units")
     status = CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_INSTORE)
     purchase_item = ForeignKey(PurchaseItem, null=True, blank=True, on_delete=SET_NULL, related_name="purchased_printer_units")
@@ -147,10 +259,97 @@ class PrinterUnit(Model):
     class Meta:
         db_table = "printer_unit"
         verbose_name_plural = "printer_units"
+        indexes = [
+            Index(fields=["status"], name="printer_unit_status"),
+            Index(fields=["store", "printer_model", "status"], name="printer_unit_picker"),
+            Index(fields=["customer_address", "status"], name="printer_unit_rented_at"),
+            Index(fields=["printer_model", "status"], name="printer_unit_model_status"),
+        ]
 
     def __str__(self):
         return self.serial_number or f"Unit #{self.pk}"
 
+    def snapshot_key(self):
+        return tuple(getattr(self, f) for f in InventorySnapshot.KEY_FIELDS)
+
+    def save(self, *args, **kwargs):
+        self.serial_number_normalized = normalize_serial(self.serial_number)
+        if (update_fields := kwargs.get("update_fields")) is not None and "serial_number" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "serial_number_normalized"}
+        with atomic():
+            old = None if self._state.adding else (
+                PrinterUnit.objects.filter(pk=self.pk).values_list(*InventorySnapshot.KEY_FIELDS).first())
+            super().save(*args, **kwargs)
+            if (new := self.snapshot_key()) != old:
+                deltas = Counter({new: 1})
+                if old:
+                    deltas[old] -= 1
+                InventorySnapshot.apply(deltas)
+
+    def delete(self, *args, **kwargs):
+        with atomic():
+            InventorySnapshot.apply({self.snapshot_key(): -1})
+            return super().delete(*args, **kwargs)
+
+
+class InventorySnapshot(Model):
+    """
+    Unit counts per (printer model, status, store, customer address), kept in step with every unit transition
+    so the inventory reports read O(groups) rows. `rebuild_inventory_snapshot` recomputes and verifies it.
+    """
+    KEY_FIELDS = ("printer_model_id", "status", "store_id", "customer_address_id")
+
+    printer_model = ForeignKey(PrinterModel, on_delete=CASCADE, related_name="+")
+    status = CharField(max_length=20, choices=PrinterUnit.STATUS_CHOICES)
+    store = ForeignKey(Store, null=True, blank=True, on_delete=SET_NULL, related_name="+")
+    customer_address = ForeignKey(CustomerAddress, null=True, blank=True, on_delete=SET_NULL, related_name="+")
+    count = IntegerField(default=0)
+
+    class Meta:
+        db_table = "inventory_snapshot"
+        verbose_name_plural = "inventory_snapshots"
+        indexes = [Index(fields=["printer_model", "status", "store", "customer_address"], name="inventory_snapshot_key")]
+
+    def __str__(self):
+        return f"{self.printer_model_id}/{self.status}/{self.store_id}/{self.customer_address_id}: {self.count}"
+
+    @classmethod
+    def apply(cls, deltas):
+        """
+        Add `deltas` ({key: change}, keyed like KEY_FIELDS) to the counts. Each change is an atomic increment of a
+        single row; a key racing into existence may get two rows, which is harmless because readers always Sum().
+        """
+        for key, change in sorted(deltas.items(), key=lambda item: repr(item[0])):
+            if not change:
+                continue
+            row = dict(zip(cls.KEY_FIELDS, key))
+            if pk := cls.objects.filter(**row).values_list("pk", flat=True).first():
+                cls.objects.filter(pk=pk).update(count=F("count") + change)
+            else:
+                cls.objects.create(**row, count=change)
+
+    @classmethod
+    def live_counts(cls):
+        return {
+            tuple(r[f] for f in cls.KEY_FIELDS): r["count"]
+            for r in PrinterUnit.objects.values(*cls.KEY_FIELDS).annotate(count=Count("id")).order_by()
+        }
+
+    @classmethod
+    def snapshot_counts(cls):
+        return {
+            tuple(r[f] for f in cls.KEY_FIELDS): r["total"]
+            for r in cls.objects.values(*cls.KEY_FIELDS).annotate(total=Sum("count")).order_by() if r["total"]
+        }
+
+    @classmethod
+    def rebuild(cls):
+        with atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                cls(**dict(zip(cls.KEY_FIELDS, key)), count=count) for key, count in cls.live_counts().items()
+            )
+
 
 class Rental(Model):
     challan_no = CharField(max_length=100, null=True, blank=True, unique=True)
@@ -164,6 +363,7 @@ class Rental(Model):
     class Meta:
         db_table = "rental"
         verbose_name_plural = "rentals"
+        indexes = [Index(fields=["challan_date", "id"], name="rental_challan_date")]
 
     def __str__(self):
         return self.challan_no
@@ -172,23 +372,50 @@ class Rental(Model):
         with atomic():
             if self._state.adding:
                 year = self.challan_date.year
-                last = Rental.objects.select_for_update().filter(challan_date__year=year).order_by('-id').first()
-                seq = int(last.challan_no.split('/')[1]) + 1 if last and last.challan_no else 1
+                seq = ChallanSequence.next_value(self._meta.db_table, year)
                 self.challan_no = generate_challan(self.customer_address.customer.name, seq, year)
             else:
-                old = Rental.objects.get(pk=self.pk)
-                if not old.approved and self.approved:
-                    print(self.units.all())
-                    for ru in self.units.all():
-                        locked_unit = PrinterUnit.objects.select_for_update().get(pk=ru.printer_unit.pk)
-                        if locked_unit.status != PrinterUnit.STATUS_INSTORE:
-                            raise ValueError(f"Unit {locked_unit} is not available for rent.")
-                        locked_unit.status = PrinterUnit.STATUS_RENTED
-                        locked_unit.store = None
-                        locked_unit.customer_address = self.customer_address
-                        locked_unit.save(update_fields=["status", "store", "customer_address"])
+                was_approved = Rental.objects.filter(pk=self.pk).values_list("approved", flat=True).get()
+                if not was_approved and self.approved:
+                    self.rent_units()
             super().save(*args, **kwargs)
 
+    def rent_units(self):
+        """Lock this rental's units in pk order, check they are all in store, then rent them in one UPDATE."""
+        unit_ids = self.units.values_list("printer_unit_id", flat=True)
+        units = list(PrinterUnit.objects.select_for_update().filter(pk__in=list(unit_ids)).order_by("pk")
+                     .only("pk", "serial_number", *InventorySnapshot.KEY_FIELDS))
+        if unavailable := [str(u) for u in units if u.status != PrinterUnit.STATUS_INSTORE]:
+            raise ValueError(f"Units {', '.join(unavailable)} are not available for rent.")
+        PrinterUnit.objects.filter(pk__in=[u.pk for u in units]).update(
+            status=PrinterUnit.STATUS_RENTED, store=None, customer_address_id=self.customer_address_id)
+        deltas = Counter()
+        for unit in units:
+            deltas[unit.snapshot_key()] -= 1
+            deltas[(unit.printer_model_id, PrinterUnit.STATUS_RENTED, None, self.customer_address_id)] += 1
+        InventorySnapshot.apply(deltas)
+        bump_version(PrinterUnit)
+
+    def add_units(self, unit_ids):
+        """Attach in-store units of this rental's store, not held by another pending rental, with one bulk insert."""
+        unit_ids = set(unit_ids)
+        with atomic():
+            # Locking the units serializes rentals drafted from the same units, so each sees the other's entries
+            available = set(PrinterUnit.objects.select_for_update().filter(
+                pk__in=unit_ids, store_id=self.store_id, status=PrinterUnit.STATUS_INSTORE
+            ).order_by("pk").values_list("pk", flat=True))
+            if unavailable := unit_ids - available:
+                raise ValueError(f"Units {sorted(unavailable)} are not available in this store.")
+            if pending := set(RentalUnit.objects.select_for_update().filter(
+                printer_unit_id__in=unit_ids, rental__approved=False
+            ).exclude(rental=self).values_list("printer_unit_id", flat=True)):
+                raise ValueError(f"Units {sorted(pending)} are already on another pending rental.")
+            RentalUnit.objects.bulk_create(
+                [RentalUnit(rental=self, printer_unit_id=pk) for pk in sorted(unit_ids)], batch_size=UNIT_BATCH_SIZE
+            )
+        bump_version(RentalUnit)
+        bump_object_version(Rental, self.pk)
+
 
 class RentalUnit(Model):
     rental = ForeignKey(Rental, on_delete=CASCADE, related_name="units")
@@ -213,6 +440,7 @@ class RentalReturn(Model):
     class Meta:
         db_table = "rental_return"
         verbose_name_plural = "rental_returns"
+        indexes = [Index(fields=["challan_date", "id"], name="rental_return_challan_date")]
 
     def __str__(self):
         return self.challan_no
@@ -222,11 +450,44 @@ class RentalReturn(Model):
             return super().save(*args, **kwargs)
         with atomic():
             year = self.challan_date.year
-            last = RentalReturn.objects.select_for_update().filter(challan_date__year=year).order_by('-id').first()
-            seq = int(last.challan_no.split('/')[1]) + 1 if last and last.challan_no else 1
+            seq = ChallanSequence.next_value(self._meta.db_table, year)
             self.challan_no = generate_challan(self.customer_address.customer.name,seq,year)
             super().save(*args, **kwargs)
 
+    def return_units(self, returns):
+        """Bulk-record `returns` ({unit_id: scrapped}) and move the units back to store or to scrap."""
+        with atomic():
+            rented = dict(PrinterUnit.objects.select_for_update().filter(
+                pk__in=returns, status=PrinterUnit.STATUS_RENTED, customer_address_id=self.customer_address_id
+            ).order_by("pk").values_list("pk", "printer_model_id"))
+            if not_rented := set(returns) - set(rented):
+                raise ValueError(f"Units {sorted(not_rented)} are not rented at this address.")
+            RentalReturnUnit.objects.bulk_create([
+                RentalReturnUnit(rental_return=self, printer_unit_id=pk, scrapped=scrapped)
+                for pk, scrapped in sorted(returns.items())
+            ], batch_size=UNIT_BATCH_SIZE)
+            scrapped_ids = [pk for pk, scrapped in returns.items() if scrapped]
+            returned_ids = [pk for pk, scrapped in returns.items() if not scrapped]
+            if scrapped_ids:
+                PrinterUnit.objects.filter(pk__in=scrapped_ids).update(
+                    status=PrinterUnit.STATUS_SCRAPPED, store=None, customer_address=None)
+            if returned_ids:
+                PrinterUnit.objects.filter(pk__in=returned_ids).update(
+                    status=PrinterUnit.STATUS_INSTORE, store_id=self.store_id, customer_address=None)
+            deltas = Counter()
+            for pk, printer_model_id in rented.items():
+                deltas[(printer_model_id, PrinterUnit.STATUS_RENTED, None, self.customer_address_id)] -= 1
+                deltas[self.returned_unit_key(printer_model_id, returns[pk])] += 1
+            InventorySnapshot.apply(deltas)
+            bump_version(PrinterUnit)
+            bump_version(RentalReturnUnit)
+            bump_object_version(RentalReturn, self.pk)
+
+    def returned_unit_key(self, printer_model_id, scrapped):
+        if scrapped:
+            return (printer_model_id, PrinterUnit.STATUS_SCRAPPED, None, None)
+        return (printer_model_id, PrinterUnit.STATUS_INSTORE, self.store_id, None)
+
 
 class RentalReturnUnit(Model):
     rental_return = ForeignKey(RentalReturn, on_delete=CASCADE, related_name="rental_returned_units")
@@ -245,14 +506,14 @@ class RentalReturnUnit(Model):
         with atomic():
             super().save(*args, **kwargs)
             if creating:
-                unit = self.printer_unit
+                units = PrinterUnit.objects.filter(pk=self.printer_unit_id)
+                old = units.values_list(*InventorySnapshot.KEY_FIELDS).get()
                 if self.scrapped:
-                    unit.status = PrinterUnit.STATUS_SCRAPPED
-                    unit.store = None
-                    unit.customer_address = None
+                    units.update(status=PrinterUnit.STATUS_SCRAPPED, store=None, customer_address=None)
                 else:
-                    unit.status = PrinterUnit.STATUS_INSTORE
-                    unit.store = self.rental_return.store
-                    unit.customer_address = None
-                unit.save(update_fields=["status", "store", "customer_address"])
+                    units.update(status=PrinterUnit.STATUS_INSTORE, store_id=self.rental_return.store_id, customer_address=None)
+                deltas = Counter({self.rental_return.returned_unit_key(old[0], self.scrapped): 1})
+                deltas[old] -= 1
+                InventorySnapshot.apply(deltas)
+                bump_version(PrinterUnit)
 
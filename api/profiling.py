@@ -0,0 +1,176 @@
+"""
+Per-request cost accounting: query count, SQL time, repeated queries and template/serializer render time. Results go
+out as a Server-Timing header and one INFO-level JSON log line per request; requests slower than
+PROFILING_SLOW_REQUEST_MS are sampled into a warning that lists every query they ran.
+"""
+import json
+import logging
+import random
+from collections import Counter
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from time import perf_counter
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+# Profile of the request being handled on this thread / task, if any
+active_profile = ContextVar("active_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = []  # (alias, sql, params, seconds)
+        self.render_time = 0.0
+        self.rendering = False
+
+    def record_query(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((context["connection"].alias, sql, params, perf_counter() - start))
+
+    @property
+    def sql_time(self):
+        return sum(q[3] for q in self.queries)
+
+    def duplicates(self):
+        """Executions beyond the first of each identical (sql, params) pair."""
+        counts = Counter((alias, sql, repr(params)) for alias, sql, params, _ in self.queries)
+        return sum(n - 1 for n in counts.values())
+
+    def similar(self):
+        """The most repeated SQL shape and how often it ran; a high count with varying params smells of N+1."""
+        counts = Counter(sql for _, sql, _, _ in self.queries)
+        return counts.most_common(1)[0] if counts else (None, 0)
+
+
+def record_active_query(execute, sql, params, many, context):
+    profile = active_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.record_query(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # One recorder per connection, first in line, so execute_wrapper() blocks still pop their own wrapper. It reads
+    # the profile from the context, which sync_to_async carries into the thread an async view's queries run in.
+    if record_active_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_active_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid="install_query_recorder")
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = active_profile.get()
+        if profile is None or profile.rendering:
+            return super().render(context, request)
+        profile.rendering = True
+        start = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.rendering = False
+            profile.render_time += perf_counter() - start
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time counted into the active request profile."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return ProfiledTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class QueryProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = active_profile.set(profile)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            active_profile.reset(token)
+        self.report(request, response, profile, perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = active_profile.set(profile)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            active_profile.reset(token)
+        self.report(request, response, profile, perf_counter() - start)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses and TemplateResponses render after the view returns; time that as render too
+        profile = active_profile.get()
+        if profile is not None:
+            start = perf_counter()
+            profile.rendering = True
+
+            def rendered(response):
+                profile.rendering = False
+                profile.render_time += perf_counter() - start
+            response.add_post_render_callback(rendered)
+        return response
+
+    def report(self, request, response, profile, total):
+        duplicates = profile.duplicates()
+        similar_sql, similar_count = profile.similar()
+        match = request.resolver_match
+        stats = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "queries": len(profile.queries),
+            "duplicates": duplicates,
+            "max_similar": similar_count,
+            "db_ms": round(profile.sql_time * 1000, 2),
+            "render_ms": round(profile.render_time * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+        }
+        if settings.PROFILING_SERVER_TIMING:
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={stats["db_ms"]};desc="{stats["queries"]} queries, {duplicates} duplicate"',
+                f'render;dur={stats["render_ms"]}',
+                f'total;dur={stats["total_ms"]}',
+            ])
+        logger.info(json.dumps(stats))
+
+        slow_ms = settings.PROFILING_SLOW_REQUEST_MS
+        if slow_ms and stats["total_ms"] >= slow_ms and random.random() < settings.PROFILING_SLOW_SAMPLE_RATE:
+            logger.warning(json.dumps({
+                **stats,
+                "most_similar_sql": similar_sql,
+                "query_list": [
+                    {"alias": alias, "ms": round(seconds * 1000, 2), "sql": sql, "params": repr(params)}
+                    for alias, sql, params, seconds in profile.queries
+                ],
+            }))
@@ -0,0 +1,66 @@
+import json
+import re
+from datetime import date
+from django.db import connection
+from .models import PrinterUnit, Rental, RentalReturn
+
+# Plan problems a hot query is known to have. Ordering by a joined column sorts the matching units: Django cannot make
+# the planner drive the join from printer_model's name index. The check still fails if such a query starts scanning.
+KNOWN_PROBLEMS = {"units by model name": ["sort"]}
+
+
+def hot_queries(store_id, printer_model_id, customer_address_id, year=None):
+    """The busiest PrinterUnit / Rental / RentalReturn reads, keyed by a short name, shaped as the views issue them."""
+    year = year or date.today().year
+    days = (date(year, 1, 1), date(year, 12, 31))
+    units = PrinterUnit.objects.all()
+    return {
+        "units by status": units.filter(status=PrinterUnit.STATUS_INSTORE).order_by("id")[:10],
+        "unit picker": units.filter(
+            store_id=store_id, printer_model_id=printer_model_id, status=PrinterUnit.STATUS_INSTORE),
+        "units to return": units.filter(customer_address_id=customer_address_id, status=PrinterUnit.STATUS_RENTED),
+        "units by model name": units.filter(status=PrinterUnit.STATUS_INSTORE)
+        .select_related("printer_model").order_by("printer_model__name", "id")[:10],
+        "rental list": Rental.objects.order_by("-challan_date", "-id")[:10],
+        "rentals in year": Rental.objects.filter(challan_date__range=days),
+        "rental return list": RentalReturn.objects.order_by("-challan_date", "-id")[:10],
+        "rental returns in year": RentalReturn.objects.filter(challan_date__range=days),
+    }
+
+
+def plan_problems(queryset):
+    """
+    EXPLAIN `queryset` and return its full table scans ("full scan of <table>") and unindexed sorts ("sort"). An
+    empty list means every table is reached through an index and rows come out in index order.
+    """
+    if connection.vendor == "mysql":
+        problems = []
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get("access_type") == "ALL":
+                    problems.append(f"full scan of {node.get('table_name')}")
+                if node.get("using_filesort"):
+                    problems.append("sort")
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(json.loads(queryset.explain(format="json")))
+        return problems
+    plan = queryset.explain()
+    if connection.vendor == "postgresql":
+        return [
+            f"full scan of {line.split(' on ')[1].split()[0]}" if "Seq Scan" in line else "sort"
+            for line in plan.splitlines() if "Seq Scan" in line or line.strip().lstrip("-> ").startswith("Sort")
+        ]
+    # SQLite: "SCAN t" without an index is a full scan, "USE TEMP B-TREE FOR ORDER BY" an unindexed sort
+    problems = []
+    for line in plan.splitlines():
+        if match := re.search(r"\bSCAN (\w+)(?!.*USING)", line):
+            problems.append(f"full scan of {match.group(1)}")
+        elif "TEMP B-TREE FOR ORDER BY" in line:
+            problems.append("sort")
+    return problems
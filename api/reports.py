@@ -0,0 +1,123 @@
+from datetime import date
+from django.db.models import Count, F, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from .models import InventorySnapshot, PrinterUnit, PurchaseItem
+
+
+def report_filters(params):
+    """Read the optional store / date_from / date_to report filters from query params. Raises ValueError."""
+    filters = {}
+    if params.get("store"):
+        try:
+            filters["store_id"] = int(params["store"])
+        except ValueError:
+            raise ValueError(f"Invalid store {params['store']!r}.")
+    for key in ("date_from", "date_to"):
+        if params.get(key):
+            try:
+                filters[key] = date.fromisoformat(params[key])
+            except ValueError:
+                raise ValueError(f"Invalid {key.replace('_', ' ')} {params[key]!r}, expected YYYY-MM-DD.")
+    return filters
+
+
+def filtered_units(store_id=None, date_from=None, date_to=None):
+    # The store is where a unit is now (rented and scrapped units have none); dates refer to its purchase.
+    units = PrinterUnit.objects.all()
+    if store_id:
+        units = units.filter(store_id=store_id)
+    if date_from:
+        units = units.filter(purchase_item__purchase__date__gte=date_from)
+    if date_to:
+        units = units.filter(purchase_item__purchase__date__lte=date_to)
+    return units
+
+
+def inventory_by_status_query(**filters):
+    """Unit counts per printer model and status; requests without dates are served from the inventory snapshot."""
+    if filters.get("date_from") or filters.get("date_to"):
+        return (
+            filtered_units(**filters)
+            .values(model=F("printer_model__name"))
+            .annotate(**{
+                status.lower(): Count("id", filter=Q(status=status))
+                for status, _ in PrinterUnit.STATUS_CHOICES
+            })
+            .order_by("model")
+        )
+    snapshot = InventorySnapshot.objects.all()
+    if filters.get("store_id"):
+        snapshot = snapshot.filter(store_id=filters["store_id"])
+    return (
+        snapshot
+        .values(model=F("printer_model__name"))
+        .annotate(**{
+            status.lower(): Coalesce(Sum("count", filter=Q(status=status)), 0)
+            for status, _ in PrinterUnit.STATUS_CHOICES
+        })
+        .filter(Q(instore__gt=0) | Q(rented__gt=0) | Q(scrapped__gt=0))
+        .order_by("model")
+    )
+
+
+def inventory_in_store_query():
+    """In-store unit quantities per (printer model, store), read from the inventory snapshot."""
+    return (
+        InventorySnapshot.objects.filter(status=PrinterUnit.STATUS_INSTORE)
+        .values(model=F("printer_model__name"), store_name=F("store__name"), address=F("store__address"))
+        .annotate(qty=Sum("count"))
+        .filter(qty__gt=0)
+        .order_by("model", "store_name")
+    )
+
+
+def inventory_on_rent_query():
+    """Rented unit quantities per (printer model, customer, address), read from the inventory snapshot."""
+    return (
+        InventorySnapshot.objects.filter(status=PrinterUnit.STATUS_RENTED)
+        .values(
+            model=F("printer_model__name"),
+            customer=F("customer_address__customer__name"),
+            address=F("customer_address__address"),
+        )
+        .annotate(qty=Sum("count"))
+        .filter(qty__gt=0)
+        .order_by("model", "customer", "address")
+    )
+
+
+# The *_query functions stay lazy so async views can consume them with `async for`
+def inventory_by_status(**filters):
+    return list(inventory_by_status_query(**filters))
+
+
+def inventory_in_store():
+    return list(inventory_in_store_query())
+
+
+def inventory_on_rent():
+    return list(inventory_on_rent_query())
+
+
+def unit_count(lookup, **filters):
+    # Correlated COUNT over printer_unit for the outer row, so totals cost one indexed lookup instead of loading units
+    units = (
+        PrinterUnit.objects.filter(**{lookup: OuterRef("pk")}, **filters)
+        .order_by().values(lookup).annotate(n=Count("pk")).values("n")
+    )
+    return Coalesce(Subquery(units, output_field=IntegerField()), 0)
+
+
+def with_unit_totals(queryset, lookup):
+    """Annotate printer_count, instore_count and rented_count; `lookup` leads from PrinterUnit to the outer model."""
+    return queryset.annotate(
+        printer_count=unit_count(lookup),
+        instore_count=unit_count(lookup, status=PrinterUnit.STATUS_INSTORE),
+        rented_count=unit_count(lookup, status=PrinterUnit.STATUS_RENTED),
+    )
+
+
+def purchase_totals(purchases):
+    """Unit totals per purchase, plus its items (one row per printer model) carrying the same totals."""
+    items = with_unit_totals(PurchaseItem.objects.select_related("printer_model").order_by("printer_model__name"), "purchase_item")
+    return with_unit_totals(purchases, "purchase_item__purchase").prefetch_related(Prefetch("items", queryset=items))
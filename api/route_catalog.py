@@ -0,0 +1,34 @@
+"""
+Every API router route, as concrete (label, path, params) requests against whatever rows the database holds. Shared by
+the query-count tests and `benchmark_routes` so a new route cannot dodge either; frontend pages are listed in
+frontend.route_catalog.
+"""
+from django.db import connection
+from django.urls import reverse
+from .profiling import RequestProfile
+from .urls import router
+
+
+def first_pk(queryset):
+    return queryset.order_by("pk").values_list("pk", flat=True).first()
+
+
+def api_requests():
+    requests = []
+    for prefix, viewset, basename in router.registry:
+        requests.append((f"{basename}-list", reverse(f"api:{basename}-list"), {}))
+        requests.append((f"async-{prefix}-list", reverse(f"api:async-{prefix}-list"), {}))
+        if pk := first_pk(viewset.queryset):
+            requests.append((f"{basename}-detail", reverse(f"api:{basename}-detail", kwargs={"pk": pk}), {}))
+    return requests
+
+
+def fetch(client, path, params):
+    """GET `path`, draining streamed bodies, and return (response, number of queries run)."""
+    profile = RequestProfile()
+    with connection.execute_wrapper(profile.record_query):
+        response = client.get(path, params)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+    return response, len(profile.queries)
@@ -0,0 +1,43 @@
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from .models import PrinterUnit, normalize_serial
+
+# Must match MySQL's ngram_token_size; shorter terms cannot use the FULLTEXT index.
+NGRAM_SIZE = 2
+
+
+def ngram_match_ids(term):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT id FROM printer_unit WHERE MATCH (serial_number_normalized) AGAINST (%s IN BOOLEAN MODE)",
+            [f'"{term}"'],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def serial_search(units, query):
+    """
+    Filter `units` to serial numbers containing `query`, ignoring case and punctuation. On MySQL, the prefix (B-tree
+    index on serial_number_normalized) and substring (FULLTEXT ngram index) lookups run as two separate queries,
+    since OR-ing them makes the optimizer scan, and their ids are merged.
+    """
+    term = normalize_serial(query)
+    if not term:
+        return units.none()
+    if connection.vendor == "mysql" and len(term) >= NGRAM_SIZE:
+        # Values are upper-cased already; istartswith avoids LIKE BINARY, which cannot use the index
+        prefix_ids = PrinterUnit.objects.filter(serial_number_normalized__istartswith=term).values_list("pk", flat=True)
+        ids = set(prefix_ids) | set(ngram_match_ids(term))
+        return units.filter(pk__in=ids, serial_number_normalized__icontains=term)
+    return units.filter(serial_number_normalized__icontains=term)
+
+
+def serial_typeahead(units, query, limit):
+    """`serial_search` ranked prefix matches first."""
+    term = normalize_serial(query)
+    if not term:
+        return units.none()
+    return serial_search(units, query).annotate(
+        rank=Case(When(serial_number_normalized__istartswith=term, then=Value(0)), default=Value(1),
+                  output_field=IntegerField())
+    ).order_by("rank", "serial_number_normalized")[:limit]
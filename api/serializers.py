@@ -1,8 +1,36 @@
+from functools import cache
+from rest_framework import serializers
 from .base_serializers import AutoNestedSerializer
+from .models import Purchase
 
+@cache
 def get_auto_serializer(model_class):
     class GenericSerializer(AutoNestedSerializer):
         class Meta:
             model = model_class
             fields = '__all__'
-    return GenericSerializer
\ No newline at end of file
+    return GenericSerializer
+
+class AddressRowSerializer(serializers.Serializer):
+    address = serializers.CharField(max_length=500)
+    mobile = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True)
+
+
+class PurchaseItemTotalsSerializer(serializers.Serializer):
+    printer_model = serializers.IntegerField(source="printer_model_id")
+    printer_model_name = serializers.CharField(source="printer_model.name")
+    quantity = serializers.IntegerField()
+    printer_count = serializers.IntegerField()
+    instore_count = serializers.IntegerField()
+    rented_count = serializers.IntegerField()
+
+
+class PurchaseSerializer(get_auto_serializer(Purchase)):
+    # Filled from reports.purchase_totals annotations; a plain Purchase has none of them
+    printer_count = serializers.IntegerField(read_only=True)
+    instore_count = serializers.IntegerField(read_only=True)
+    rented_count = serializers.IntegerField(read_only=True)
+    model_quantities = PurchaseItemTotalsSerializer(source="items", many=True, read_only=True)
+
+    class Meta(get_auto_serializer(Purchase).Meta):
+        pass
@@ -0,0 +1,44 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+from .cache import bump_object_version, bump_version
+from .models import PrinterUnit, Rental, RentalReturn, RentalReturnUnit, RentalUnit
+
+
+def invalidate_model(sender, **kwargs):
+    bump_version(sender)
+
+
+for model in apps.get_app_config("api").get_models():
+    post_save.connect(invalidate_model, sender=model, dispatch_uid=f"invalidate_{model._meta.label_lower}_save")
+    post_delete.connect(invalidate_model, sender=model, dispatch_uid=f"invalidate_{model._meta.label_lower}_delete")
+
+
+# Rendered challans (api.challans) are cached per challan and keyed by its object version
+def invalidate_challan(sender, instance, **kwargs):
+    bump_object_version(sender, instance.pk)
+
+
+def invalidate_parent_challan(sender, instance, **kwargs):
+    if sender is RentalUnit:
+        bump_object_version(Rental, instance.rental_id)
+    else:
+        bump_object_version(RentalReturn, instance.rental_return_id)
+
+
+def invalidate_unit_challans(sender, instance, created, update_fields=None, **kwargs):
+    # Only the serial number of a unit is printed on a challan
+    if created or (update_fields is not None and "serial_number" not in update_fields):
+        return
+    for pk in RentalUnit.objects.filter(printer_unit=instance).values_list("rental_id", flat=True):
+        bump_object_version(Rental, pk)
+    for pk in RentalReturnUnit.objects.filter(printer_unit=instance).values_list("rental_return_id", flat=True):
+        bump_object_version(RentalReturn, pk)
+
+
+for model in (Rental, RentalReturn):
+    post_save.connect(invalidate_challan, sender=model, dispatch_uid=f"challan_{model._meta.label_lower}_save")
+    post_delete.connect(invalidate_challan, sender=model, dispatch_uid=f"challan_{model._meta.label_lower}_delete")
+for model in (RentalUnit, RentalReturnUnit):
+    post_save.connect(invalidate_parent_challan, sender=model, dispatch_uid=f"challan_{model._meta.label_lower}_save")
+    post_delete.connect(invalidate_parent_challan, sender=model, dispatch_uid=f"challan_{model._meta.label_lower}_delete")
+post_save.connect(invalidate_unit_challans, sender=PrinterUnit, dispatch_uid="challan_printer_unit_save")
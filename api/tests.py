@@ -1,3 +1,628 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from asgiref.sync import sync_to_async
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .cache import cached_list, version_key
+from .challans import challan_pdf
+from .exports import export_response
+from .fixtures import generate_fleet
+from .imports import xlsx_rows
+from .profiling import QueryProfilingMiddleware
+from .query_plans import KNOWN_PROBLEMS, hot_queries, plan_problems
+from .route_catalog import api_requests, fetch
+from .models import (
+    ChallanSequence, Customer, CustomerAddress, InventorySnapshot, PrinterModel, PrinterUnit, Purchase, PurchaseItem,
+    Rental, RentalReturn, RentalReturnUnit, RentalUnit, Store, Vendor,
+)
 
-# Create your tests here.
+
+class ChallanSequenceTests(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Main Store", address="Street 1")
+        self.address = CustomerAddress.objects.create(
+            customer=Customer.objects.create(name="Acme Corp"), address="Street 2")
+
+    def create_rental(self, challan_date):
+        return Rental.objects.create(
+            challan_date=challan_date, order_date=challan_date, store=self.store, customer_address=self.address)
+
+    def test_numbers_restart_each_calendar_year(self):
+        self.assertEqual(self.create_rental(date(2025, 3, 31)).challan_no, "AC/001/25-26")
+        self.assertEqual(self.create_rental(date(2025, 4, 1)).challan_no, "AC/002/25-26")
+        self.assertEqual(self.create_rental(date(2025, 12, 31)).challan_no, "AC/003/25-26")
+        self.assertEqual(self.create_rental(date(2026, 1, 1)).challan_no, "AC/001/26-27")
+
+    def test_row_created_by_a_concurrent_first_document_is_reused(self):
+        ChallanSequence.objects.create(doc_type="rental", year=2025, last_value=5)
+        with mock.patch("django.db.models.QuerySet.exists", return_value=False):
+            self.assertEqual(ChallanSequence.next_value("rental", 2025), 6)
+        self.assertEqual(ChallanSequence.next_value("rental", 2026), 1)
+
+    def test_sequence_is_not_exposed_through_the_api(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("tester"))
+        self.create_rental(date(2025, 6, 1))
+        self.assertEqual(client.get("/api/challan-sequence/").status_code, 404)
+        self.assertEqual(client.patch("/api/challan-sequence/1/", {"last_value": 0}).status_code, 404)
+
+
+class InventorySnapshotTests(TestCase):
+    def test_snapshot_follows_unit_transitions(self):
+        store = Store.objects.create(name="Main Store", address="Street 1")
+        vendor = Vendor.objects.create(name="Acme Vendor", address="Street 2", mobile="0")
+        address = CustomerAddress.objects.create(
+            customer=Customer.objects.create(name="Acme Corp"), address="Street 3")
+        purchase = Purchase.objects.create(vendor=vendor, store=store, date=date(2025, 6, 1))
+        item = PurchaseItem.objects.create(
+            purchase=purchase, printer_model=PrinterModel.objects.create(name="Model 1"), quantity=5)
+        self.assertEqual(InventorySnapshot.snapshot_counts(), InventorySnapshot.live_counts())
+
+        rental = Rental.objects.create(
+            challan_date=date(2025, 6, 2), order_date=date(2025, 6, 2), store=store, customer_address=address)
+        units = list(item.purchased_printer_units.order_by("pk"))
+        rental.add_units([u.pk for u in units[:4]])
+        rental.approved = True
+        rental.save()
+        self.assertEqual(InventorySnapshot.snapshot_counts(), InventorySnapshot.live_counts())
+
+        rental_return = RentalReturn.objects.create(challan_date=date(2025, 6, 3), customer_address=address, store=store)
+        rental_return.return_units({units[0].pk: True, units[1].pk: False})
+        RentalReturnUnit.objects.create(rental_return=rental_return, printer_unit=units[2], scrapped=True)
+        units[4].serial_number = "SN-1"
+        units[4].store = None
+        units[4].save()
+        self.assertEqual(InventorySnapshot.snapshot_counts(), InventorySnapshot.live_counts())
+
+    def test_snapshot_is_not_exposed_through_the_api(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("tester"))
+        self.assertEqual(client.get("/api/inventory-snapshot/").status_code, 404)
+        self.assertEqual(client.delete("/api/inventory-snapshot/1/").status_code, 404)
+
+
+class PurchaseItemUnitTests(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(name="Main Store", address="Street 1")
+        self.model = PrinterModel.objects.create(name="Model 1")
+        self.vendor = Vendor.objects.create(name="Acme Vendor", address="Street 2", mobile="0")
+        self.purchase = Purchase.objects.create(vendor=self.vendor, store=self.store, date=date(2025, 6, 1))
+
+    @mock.patch("api.models.UNIT_BATCH_SIZE", 2)
+    def test_units_are_created_in_batches_with_serials_and_snapshot(self):
+        key = (self.model.pk, PrinterUnit.STATUS_INSTORE, self.store.pk, None)
+        earlier = Purchase.objects.create(vendor=self.vendor, store=self.store, date=date(2025, 5, 1))
+        PurchaseItem(purchase=earlier, printer_model=self.model, quantity=2).save()
+        item = PurchaseItem(purchase=self.purchase, printer_model=self.model, quantity=5)
+        with CaptureQueriesContext(connection) as queries:
+            item.save(serial_numbers=[" sn-1 ", "", "SN-3"])
+        self.assertEqual(sum('INSERT INTO "printer_unit"' in q["sql"].replace("`", '"') for q in queries), 3)
+        units = list(item.purchased_printer_units.order_by("pk"))
+        self.assertEqual([u.serial_number for u in units], ["sn-1", None, "SN-3", None, None])
+        self.assertEqual([u.serial_number_normalized for u in units], ["SN1", None, "SN3", None, None])
+        self.assertTrue(all(u.store_id == self.store.pk and u.status == PrinterUnit.STATUS_INSTORE for u in units))
+        self.assertEqual(InventorySnapshot.snapshot_counts(), {key: 7})
+        self.assertEqual(InventorySnapshot.snapshot_counts(), InventorySnapshot.live_counts())
+
+    def test_too_many_serials_create_nothing(self):
+        with self.assertRaisesMessage(ValueError, "Got 3 serial numbers for 2 units."):
+            PurchaseItem(purchase=self.purchase, printer_model=self.model, quantity=2).save(
+                serial_numbers=["SN-1", "SN-2", "SN-3"])
+        self.assertFalse(PurchaseItem.objects.exists())
+        self.assertFalse(PrinterUnit.objects.exists())
+        self.assertEqual(InventorySnapshot.snapshot_counts(), {})
+
+
+def rental_fixture(serials):
+    store = Store.objects.create(name="Main Store", address="Street 1")
+    vendor = Vendor.objects.create(name="Acme Vendor", address="Street 2", mobile="0")
+    address = CustomerAddress.objects.create(customer=Customer.objects.create(name="Acme Corp"), address="Street 3")
+    purchase = Purchase.objects.create(vendor=vendor, store=store, date=date(2025, 6, 1))
+    item = PurchaseItem(purchase=purchase, printer_model=PrinterModel.objects.create(name="Model 1"), quantity=len(serials))
+    item.save(serial_numbers=serials)
+    return store, address, list(item.purchased_printer_units.order_by("pk").values_list("pk", flat=True))
+
+
+def create_rental(store, address, unit_ids=()):
+    rental = Rental.objects.create(
+        challan_date=date(2025, 6, 2), order_date=date(2025, 6, 2), store=store, customer_address=address)
+    RentalUnit.objects.bulk_create(RentalUnit(rental=rental, printer_unit_id=pk) for pk in unit_ids)
+    return rental
+
+
+class RentalBatchCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("tester"))
+        store, address, self.units = rental_fixture(["SN-1", "SN-2", "SN-3", "SN-4"])
+        self.data = {"challan_date": "2025-06-02", "order_date": "2025-06-02", "store": store.pk,
+                     "customer_address": address.pk}
+
+    def create(self, printer_units):
+        return self.client.post("/api/rental/batch/", {**self.data, "printer_units": printer_units}, format="json")
+
+    def test_creates_the_rental_with_its_units(self):
+        response = self.create(self.units[:3])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["printer_units"], self.units[:3])
+        self.assertEqual(sorted(Rental.objects.get().units.values_list("printer_unit_id", flat=True)), self.units[:3])
+
+    def test_rejects_invalid_ids(self):
+        self.assertEqual(self.create("1,2").json(), {"printer_units": "Expected a list of ids."})
+        for digits in ("12", str(self.units[0])):
+            self.assertEqual(self.create(digits).json(), {"printer_units": "Expected a list of ids."})
+        self.assertEqual(self.create([]).json(), {"printer_units": "Select at least one printer unit."})
+        response = self.create([self.units[0], 999])
+        self.assertEqual(response.json(), {"printer_units": "Units [999] are not available in this store."})
+        self.assertFalse(Rental.objects.exists())
+
+    def test_rejects_units_on_another_pending_rental(self):
+        self.assertEqual(self.create(self.units[:3]).status_code, 201)
+        response = self.create(self.units[2:])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"printer_units": f"Units [{self.units[2]}] are already on another pending rental."})
+        self.assertEqual(Rental.objects.count(), 1)
+
+
+class RentalReturnBatchCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("tester"))
+        self.store, self.address, self.units = rental_fixture(["SN-1", "SN-2", "SN-3", "SN-4"])
+        rental = create_rental(self.store, self.address, self.units[:3])
+        rental.approved = True
+        rental.save()
+        self.data = {"challan_date": "2025-06-03", "store": self.store.pk, "customer_address": self.address.pk}
+
+    def create(self, units, **data):
+        return self.client.post("/api/rental-return/batch/", {**self.data, **data, "units": units}, format="json")
+
+    def test_returns_and_scraps_units(self):
+        response = self.create([{"printer_unit": self.units[0]}, {"printer_unit": self.units[1], "scrapped": True}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(PrinterUnit.objects.order_by("pk").values_list("status", "store", "customer_address")), [
+                (PrinterUnit.STATUS_INSTORE, self.store.pk, None), (PrinterUnit.STATUS_SCRAPPED, None, None),
+                (PrinterUnit.STATUS_RENTED, None, self.address.pk), (PrinterUnit.STATUS_INSTORE, self.store.pk, None),
+            ])
+        self.assertEqual(InventorySnapshot.snapshot_counts(), InventorySnapshot.live_counts())
+
+    def test_only_units_rented_at_the_address_can_come_back(self):
+        self.assertEqual(self.create("1").json(), {"units": "Expected a list of {printer_unit, scrapped} objects."})
+        self.assertEqual(self.create([]).json(), {"units": "Select at least one unit to return."})
+        other = CustomerAddress.objects.create(customer=self.address.customer, address="Street 4")
+        for address, units in ((self.address, self.units[2:]), (other, self.units[:1])):
+            response = self.create([{"printer_unit": pk} for pk in units], customer_address=address.pk)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("are not rented at this address", response.json()["units"])
+        self.assertFalse(RentalReturn.objects.exists())
+        self.assertEqual(PrinterUnit.objects.filter(status=PrinterUnit.STATUS_RENTED).count(), 3)
+
+
+class RentalApprovalTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("tester"))
+        store, self.address, self.units = rental_fixture(["SN-1", "SN-2", "SN-3"])
+        self.rental = create_rental(store, self.address, self.units)
+
+    def test_approval_rents_every_unit(self):
+        response = self.client.patch(f"/api/rental/{self.rental.pk}/", {"approved": True}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(PrinterUnit.objects.values_list("status", "store", "customer_address")),
+                         {(PrinterUnit.STATUS_RENTED, None, self.address.pk)})
+
+    def test_approval_is_refused_when_a_unit_left_the_store(self):
+        PrinterUnit.objects.filter(pk=self.units[1]).update(status=PrinterUnit.STATUS_SCRAPPED)
+        response = self.client.patch(f"/api/rental/{self.rental.pk}/", {"approved": True}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"approved": "Units SN-2 are not available for rent."})
+        self.assertFalse(Rental.objects.get().approved)
+        self.assertEqual(PrinterUnit.objects.filter(status=PrinterUnit.STATUS_INSTORE).count(), 2)
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class RentalApprovalConcurrencyTests(TransactionTestCase):
+    def test_overlapping_approvals_rent_each_unit_once(self):
+        store, address, units = rental_fixture([f"SN-{i}" for i in range(10)])
+        rentals = [create_rental(store, address, units[:6]), create_rental(store, address, units[4:])]
+
+        def approve(rental):
+            try:
+                rental.approved = True
+                rental.save()
+                return True
+            except ValueError:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(len(rentals)) as pool:
+            self.assertEqual(sorted(pool.map(approve, rentals)), [False, True])
+        self.assertEqual(Rental.objects.filter(approved=True).count(), 1)
+        self.assertEqual(InventorySnapshot.snapshot_counts(), InventorySnapshot.live_counts())
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ChallanSequenceConcurrencyTests(TransactionTestCase):
+    workers = 8
+    creates_per_worker = 10
+
+    def test_parallel_creates_get_unique_gapless_numbers(self):
+        vendor = Vendor.objects.create(name="Acme Vendor", address="Street 1", mobile="0")
+        store = Store.objects.create(name="Main Store", address="Street 2")
+
+        def create_purchases(_):
+            try:
+                for _ in range(self.creates_per_worker):
+                    Purchase.objects.create(vendor=vendor, store=store, date=date(2025, 6, 1))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            list(pool.map(create_purchases, range(self.workers)))
+
+        seqs = sorted(int(c.split("/")[1]) for c in Purchase.objects.values_list("challan_no", flat=True))
+        self.assertEqual(seqs, list(range(1, self.workers * self.creates_per_worker + 1)))
+
+
+class ListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        store = Store.objects.create(name="Main Store", address="Street 1")
+        vendor = Vendor.objects.create(name="Acme Vendor", address="Street 2", mobile="0")
+        address = CustomerAddress.objects.create(
+            customer=Customer.objects.create(name="Acme Corp"), address="Street 3")
+        purchase = Purchase.objects.create(vendor=vendor, store=store, date=date(2025, 6, 1))
+        for i in range(3):
+            printer_model = PrinterModel.objects.create(name=f"Model {i}")
+            PurchaseItem.objects.create(purchase=purchase, printer_model=printer_model, quantity=10)
+        PrinterUnit.objects.filter(pk__lte=5).update(
+            status=PrinterUnit.STATUS_RENTED, store=None, customer_address=address)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("tester"))
+
+    def test_printer_unit_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/printer-unit/")
+        self.assertEqual(len(response.json()), 30)
+        self.assertEqual(response.json()[0]["customer_address"]["address"], "Street 3")
+
+    def test_custom_model_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/custom/printer-unit/", {"status": PrinterUnit.STATUS_INSTORE})
+        self.assertEqual(len(response.json()), 25)
+
+    def test_purchase_list_totals_do_not_load_units(self):
+        with self.assertNumQueries(2):
+            purchase = self.client.get("/api/purchase/").json()[0]
+        self.assertEqual((purchase["printer_count"], purchase["instore_count"], purchase["rented_count"]), (30, 25, 5))
+        self.assertEqual([m["printer_count"] for m in purchase["model_quantities"]], [10, 10, 10])
+
+    def test_purchase_write_responses_carry_totals(self):
+        purchase = Purchase.objects.get()
+        response = self.client.patch(f"/api/purchase/{purchase.pk}/", {"date": "2025-06-02"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["printer_count"], response.json()["rented_count"]), (30, 5))
+        self.assertEqual([m["instore_count"] for m in response.json()["model_quantities"]], [5, 10, 10])
+        response = self.client.post(
+            "/api/purchase/", {"vendor": purchase.vendor_id, "store": purchase.store_id, "date": "2025-06-03"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()["printer_count"], response.json()["model_quantities"]), (0, []))
+
+    async def test_async_lists_match_sync(self):
+        user = await User.objects.acreate(username="async-tester")
+        async_client = AsyncClient()
+        await async_client.aforce_login(user)
+        for path, params in [
+            ("custom/printer-unit/", {"fields": "serial_number,status", "limit": 20}),
+            ("printer-unit/", {}),
+            ("purchase/", {}),
+            ("reports/inventory-by-status/", {}),
+        ]:
+            with self.subTest(path):
+                response = await async_client.get(f"/api/async/{path}", params)
+                sync_response = await sync_to_async(self.client.get)(f"/api/{path}", params)
+                self.assertEqual(response.json(), sync_response.json())
+        self.assertEqual((await AsyncClient().get("/api/async/printer-unit/")).status_code, 403)
+
+    def test_custom_model_list_projection_and_cursor(self):
+        first = self.client.get("/api/custom/printer-unit/", {"fields": "serial_number", "limit": 20}).json()
+        self.assertEqual(first["results"][0], {"serial_number": None, "id": 1})
+        second = self.client.get(
+            "/api/custom/printer-unit/", {"fields": "serial_number", "limit": 20, "cursor": first["next_cursor"]}).json()
+        self.assertEqual(len(second["results"]), 10)
+        self.assertIsNone(second["next_cursor"])
+        response = self.client.get("/api/custom/printer-unit/", {"limit": 20, "cursor": "abc"})
+        self.assertEqual((response.status_code, response.json()), (400, {"cursor": "Expected an integer."}))
+
+
+class HotQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name="Main Store", address="Street 1")
+        vendor = Vendor.objects.create(name="Acme Vendor", address="Street 2", mobile="0")
+        cls.address = CustomerAddress.objects.create(
+            customer=Customer.objects.create(name="Acme Corp"), address="Street 3")
+        purchase = Purchase.objects.create(vendor=vendor, store=cls.store, date=date(2025, 6, 1))
+        cls.printer_model = PrinterModel.objects.create(name="Model 1")
+        PurchaseItem.objects.create(purchase=purchase, printer_model=cls.printer_model, quantity=200)
+        PrinterUnit.objects.filter(pk__lte=50).update(
+            status=PrinterUnit.STATUS_RENTED, store=None, customer_address=cls.address)
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in hot_queries(self.store.pk, self.printer_model.pk, self.address.pk, 2025).items():
+            with self.subTest(name):
+                self.assertEqual(plan_problems(queryset), KNOWN_PROBLEMS.get(name, []))
+
+
+class ChallanPdfTests(TestCase):
+    def test_challan_is_cached_until_its_units_change(self):
+        store = Store.objects.create(name="Main Store", address="Street 1")
+        vendor = Vendor.objects.create(name="Acme Vendor", address="Street 2", mobile="0")
+        address = CustomerAddress.objects.create(
+            customer=Customer.objects.create(name="Acme Corp"), address="Street 3")
+        purchase = Purchase.objects.create(vendor=vendor, store=store, date=date(2025, 6, 1))
+        item = PurchaseItem.objects.create(
+            purchase=purchase, printer_model=PrinterModel.objects.create(name="Model 1"), quantity=3)
+        units = list(item.purchased_printer_units.values_list("pk", flat=True))
+        rental = Rental.objects.create(
+            challan_date=date(2025, 6, 2), order_date=date(2025, 6, 2), store=store, customer_address=address)
+        rental.add_units(units[:2])
+
+        filename, pdf = challan_pdf(Rental, rental.pk)
+        self.assertEqual(filename, "AC-001-25-26.pdf")
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        with self.assertNumQueries(0):
+            self.assertEqual(challan_pdf(Rental, rental.pk)[1], pdf)
+        rental.add_units(units[2:])
+        self.assertNotEqual(challan_pdf(Rental, rental.pk)[1], pdf)
+
+
+class ExportTests(TestCase):
+    columns = ["Text", "Number", "Blank", "Date", "Other"]
+    rows = [("=1+2", 5, None, date(2025, 6, 1), "a&b <c>"), ("@SUM(A1)", Decimal("1.50"), "", "-3", "\x01=x")]
+
+    def download(self, export_format):
+        return b"".join(export_response(export_format, "units", self.columns, iter(self.rows)).streaming_content)
+
+    def test_xlsx_round_trips_text_unchanged(self):
+        self.assertEqual(list(xlsx_rows(io.BytesIO(self.download("xlsx")))), [
+            self.columns, ["=1+2", "5", "", "2025-06-01", "a&b <c>"], ["@SUM(A1)", "1.50", "", "-3", "=x"],
+        ])
+        self.assertIn(b't="inlineStr"', zipfile.ZipFile(io.BytesIO(self.download("xlsx"))).read("xl/worksheets/sheet1.xml"))
+
+    def test_csv_keeps_formulas_as_text(self):
+        rows = list(csv.reader(io.StringIO(self.download("csv").decode("utf-8-sig"))))
+        self.assertEqual([row[0] for row in rows], ["Text", "'=1+2", "'@SUM(A1)"])
+        self.assertEqual(rows[2][3], "'-3")
+
+
+@override_settings(PROFILING_SERVER_TIMING=True, PROFILING_SLOW_REQUEST_MS=0.001, PROFILING_SLOW_SAMPLE_RATE=1)
+class QueryProfilingMiddlewareTests(TestCase):
+    def test_profile_counts_duplicates_and_samples_slow_requests(self):
+        def view(request):
+            for _ in range(3):
+                list(Store.objects.filter(pk=1))
+            return HttpResponse()
+
+        with self.assertLogs("api.profiling", "INFO") as logs:
+            response = QueryProfilingMiddleware(view)(RequestFactory().get("/stores/"))
+        self.assertIn('desc="3 queries, 2 duplicate"', response["Server-Timing"])
+        summary, slow = (json.loads(record.getMessage()) for record in logs.records)
+        self.assertEqual((summary["queries"], summary["duplicates"], summary["max_similar"]), (3, 2, 3))
+        self.assertEqual(len(slow["query_list"]), 3)
+        self.assertIn('FROM "store"', slow["most_similar_sql"].replace("`", '"'))
+
+    @override_settings(DEBUG=True)  # Django only logs handler adaptation in debug
+    async def test_async_views_are_profiled_without_a_thread_hop(self):
+        user = await User.objects.acreate(username="tester")
+        with self.assertLogs("api.profiling", "INFO") as logs, self.assertNoLogs("django.request", "DEBUG"):
+            client = AsyncClient()  # loads the middleware chain, logging any sync/async adaptation
+            await client.aforce_login(user)
+            await client.get("/api/async/store/")
+        self.assertGreaterEqual(json.loads(logs.records[0].getMessage())["queries"], 3)
+
+    def test_template_render_time_is_counted(self):
+        self.client.force_login(User.objects.create_user("tester"))
+        with self.assertLogs("api.profiling", "INFO") as logs:
+            self.client.get("/")
+        self.assertGreater(json.loads(logs.records[0].getMessage())["render_ms"], 0)
+
+
+class RouteQueryCountTests(TestCase):
+    # Warm-cache queries per route, session and user lookups included; purchases add their item prefetch
+    default_ceiling = 3
+    ceilings = {"purchase-list": 4, "async-purchase-list": 4, "purchase-detail": 4}
+    fleet = dict(customers=10, units=300, years=1, printer_models=5, stores=2, vendors=2, rentals_per_month=4)
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_fleet(**cls.fleet, seed=1)
+        cls.user = User.objects.create_user("tester")
+
+    def query_counts(self):
+        counts = {}
+        for label, path, params in api_requests():
+            fetch(self.client, path, params)
+            response, queries = fetch(self.client, path, params)
+            counts[label] = (response.status_code, queries)
+        return counts
+
+    def test_routes_stay_under_ceilings_as_data_grows(self):
+        self.client.force_login(self.user)
+        counts = self.query_counts()
+        generate_fleet(**self.fleet, seed=2)
+        for label, (status, queries) in self.query_counts().items():
+            with self.subTest(label):
+                self.assertEqual(status, 200)
+                self.assertLessEqual(queries, self.ceilings.get(label, self.default_ceiling))
+                self.assertEqual(queries, counts[label][1], "query count grows with the data")
+
+
+class CustomerBatchUpsertTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("tester"))
+
+    def test_creates_then_upserts_addresses(self):
+        response = self.client.post("/api/customer/batch/", {"name": "Acme Corp", "addresses": [
+            {"address": "Street 1", "mobile": "9000000001"}, {"address": "Street 2"},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 201)
+        customer_id = response.json()["id"]
+        response = self.client.post("/api/customer/batch/", {"id": customer_id, "addresses": [
+            {"address": "Street 2", "mobile": "9000000002"}, {"address": "Street 3"},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(CustomerAddress.objects.filter(customer_id=customer_id).order_by("address").values_list("address", "mobile")),
+            [("Street 1", "9000000001"), ("Street 2", "9000000002"), ("Street 3", None)])
+
+    def test_invalid_address_creates_nothing(self):
+        response = self.client.post("/api/customer/batch/", {"name": "Acme Corp", "addresses": [
+            {"address": "Street 1"}, {"address": "x" * 501},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Customer.objects.exists())
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("tester"))
+        Store.objects.create(name="Main Store", address="Street 1")
+        PrinterModel.objects.create(name="Model 1")
+
+    def upload(self, kind, content):
+        file = SimpleUploadedFile(f"{kind}.csv", content.encode())
+        return self.client.post(f"/api/import/{kind}/", {"file": file}, format="multipart")
+
+    def test_units_import_reports_bad_rows_and_skips_existing(self):
+        content = "Serial Number,Printer Model,Store\nSN-1,model 1,Main Store\nSN-2,Model 9,Main Store\nsn-1,Model 1,Main Store\n"
+        self.assertEqual(self.upload("printer-unit", content).json(), {
+            "created": 1, "updated": 0, "skipped": 0, "skipped_rows": [],
+            "errors": [{"row": 3, "error": "Unknown printer model 'Model 9'."}, {"row": 4, "error": "Duplicate of row 2."}],
+        })
+        self.assertEqual(self.upload("printer-unit", content).json()["skipped_rows"], [2])
+        self.assertEqual(PrinterUnit.objects.get().serial_number_normalized, "SN1")
+        self.assertEqual(InventorySnapshot.snapshot_counts(), InventorySnapshot.live_counts())
+
+    def test_rows_that_turn_up_after_the_existence_check_are_skipped(self):
+        self.upload("printer-unit", "serial_number,printer_model,store\nSN-1,Model 1,Main Store\n")
+        # As if another import inserted SN-1 between this chunk's existence check and its insert
+        with mock.patch("api.imports.existing_keys", return_value=set()):
+            response = self.upload("printer-unit", "serial_number,printer_model,store\nSN-1,Model 1,Main Store\n"
+                                                   "SN-2,Model 1,Main Store\n")
+        self.assertEqual((response.json()["created"], response.json()["skipped_rows"]), (1, [2]))
+        self.assertEqual(InventorySnapshot.snapshot_counts(), InventorySnapshot.live_counts())
+
+    def test_rejects_file_without_required_columns(self):
+        response = self.upload("vendor", "name\nAcme\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"file": "Missing columns: address, mobile."})
+
+
+class SerialAssignmentTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("tester"))
+        store = Store.objects.create(name="Main Store", address="Street 1")
+        vendor = Vendor.objects.create(name="Acme Vendor", address="Street 2", mobile="0")
+        purchase = Purchase.objects.create(vendor=vendor, store=store, date=date(2025, 6, 1))
+        self.item = PurchaseItem.objects.create(
+            purchase=purchase, printer_model=PrinterModel.objects.create(name="Model 1"), quantity=300)
+        self.url = f"/api/purchase-item/{self.item.pk}/serials/"
+
+    def test_assigns_a_shipment_in_one_request(self):
+        serials = [f"sn-{i:03d}" for i in range(300)]
+        with self.assertNumQueries(10):
+            response = self.client.post(self.url, {"serial_numbers": serials[:299]}, format="json")
+        self.assertEqual(response.json()["remaining"], 1)
+        self.assertEqual(PrinterUnit.objects.get(serial_number="sn-042").serial_number_normalized, "SN042")
+
+        response = self.client.post(self.url, {"serial_numbers": ["sn-001", "SN-X"]}, format="json")
+        self.assertEqual(response.json(), {"serial_numbers": "Serial numbers already in use: sn-001."})
+        response = self.client.post(self.url, {"serial_numbers": ["a", "b"]}, format="json")
+        self.assertEqual(response.json(), {"serial_numbers": "Got 2 serial numbers for 1 units without one."})
+        self.assertEqual(PrinterUnit.objects.filter(serial_number__isnull=True).count(), 1)
+
+
+class MasterCacheTests(TestCase):
+    def test_cached_list_is_invalidated_by_writes(self):
+        Store.objects.create(name="Store A", address="Street 1")
+        self.assertEqual([s.name for s in cached_list(Store.objects.order_by("name"))], ["Store A"])
+        with self.assertNumQueries(0):
+            cached_list(Store.objects.order_by("name"))
+        store = Store.objects.create(name="Store B", address="Street 2")
+        self.assertEqual([s.name for s in cached_list(Store.objects.order_by("name"))], ["Store A", "Store B"])
+        store.delete()
+        self.assertEqual([s.name for s in cached_list(Store.objects.order_by("name"))], ["Store A"])
+
+    def test_evicted_version_does_not_revive_old_entries(self):
+        Store.objects.create(name="Store A", address="Street 1")
+        cached_list(Store.objects.order_by("name"))
+        cache.delete(version_key(Store))  # evicted, then bumped by a write
+        Store.objects.create(name="Store B", address="Street 2")
+        self.assertEqual(len(cached_list(Store.objects.order_by("name"))), 2)
+        cache.delete(version_key(Store))  # evicted, then read again
+        self.assertEqual(len(cached_list(Store.objects.order_by("name"))), 2)
+
+
+class SerialTypeaheadTests(TestCase):
+    def test_ranks_prefix_matches_first(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("tester"))
+        rental_fixture(["xab-1", "AB-12", "ab 1", "ZZ-1"])
+
+        def search(**params):
+            return [u["serial_number"] for u in client.get("/api/printer-unit/search/", params).json()]
+
+        self.assertEqual(search(q="Ab1"), ["ab 1", "AB-12", "xab-1"])
+        self.assertEqual(search(q="ab1", limit=1), ["ab 1"])
+        self.assertEqual(search(q="ab1", status=PrinterUnit.STATUS_RENTED), [])
+        self.assertEqual(search(q="--"), [])
+
+
+class UnitPickerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("tester"))
+        self.store = Store.objects.create(name="Main Store", address="Street 1")
+        other_store = Store.objects.create(name="Other Store", address="Street 2")
+        vendor = Vendor.objects.create(name="Acme Vendor", address="Street 3", mobile="0")
+        self.model = PrinterModel.objects.create(name="Model 1")
+        for store, serials in ((self.store, [f"AB-{i}" for i in range(5)]), (other_store, ["AB-9"])):
+            purchase = Purchase.objects.create(vendor=vendor, store=store, date=date(2025, 6, 1))
+            item = PurchaseItem(purchase=purchase, printer_model=self.model, quantity=len(serials))
+            item.save(serial_numbers=serials)
+        PrinterUnit.objects.filter(serial_number="AB-4").update(status=PrinterUnit.STATUS_SCRAPPED)
+
+    def test_pages_and_searches_in_store_units(self):
+        params = {"store": self.store.pk, "printer_model": self.model.pk, "limit": 3}
+        page = self.client.get("/api/printer-unit/available/", params).json()
+        self.assertEqual([u["serial_number"] for u in page["results"]], ["AB-0", "AB-1", "AB-2"])
+        page = self.client.get("/api/printer-unit/available/", {**params, "cursor": page["next_cursor"]}).json()
+        self.assertEqual(page, {"results": [{"id": page["results"][0]["id"], "serial_number": "AB-3"}],
+                                "next_cursor": None})
+        page = self.client.get("/api/printer-unit/available/", {**params, "q": "ab1"}).json()
+        self.assertEqual([u["serial_number"] for u in page["results"]], ["AB-1"])
+        response = self.client.get("/api/printer-unit/available/", {"store": self.store.pk})
+        self.assertEqual(response.json(), {"printer_model": "This field is required."})
+
+        models = self.client.get("/api/printer-unit/available-models/", {"store": self.store.pk}).json()
+        self.assertEqual(models, [{"id": self.model.pk, "name": "Model 1", "available": 5}])
@@ -2,7 +2,7 @@ from django.urls import path, include
 from django.contrib.auth import views as auth_views
 from rest_framework.routers import DefaultRouter
 from django.apps import apps
-from . import views
+from . import views, async_views
 from .views import get_generic_viewset
 import re
 
@@ -13,6 +13,19 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('signup/', views.signup_view, name='signup'), 
     path('custom/<str:model_name>/',views.custom_model_list_view,name='custom-model-list'),   
+    path('rental/batch/', views.rental_batch_create_view, name='rental-batch-create'),
+    path('rental-return/batch/', views.rental_return_batch_create_view, name='rental-return-batch-create'),
+    path('purchase-item/<int:pk>/serials/', views.purchase_item_serials_view, name='purchase-item-serials'),
+    path('customer/batch/', views.customer_batch_upsert_view, name='customer-batch-upsert'),
+    path('import/<str:kind>/', views.import_view, name='import'),
+    path('reports/inventory-by-status/', views.inventory_by_status_view, name='inventory-by-status'),
+    path('printer-unit/search/', views.printer_unit_search_view, name='printer-unit-search'),
+    path('printer-unit/available/', views.printer_unit_available_view, name='printer-unit-available'),
+    path('printer-unit/available-models/', views.printer_unit_available_models_view, name='printer-unit-available-models'),
+    path('async/custom/<str:model_name>/', async_views.custom_model_list_view, name='async-custom-model-list'),
+    path('async/reports/inventory-by-status/', async_views.inventory_by_status_view, name='async-inventory-by-status'),
+    path('async/reports/inventory-in-store/', async_views.inventory_in_store_view, name='async-inventory-in-store'),
+    path('async/reports/inventory-on-rent/', async_views.inventory_on_rent_view, name='async-inventory-on-rent'),
 ]
 
 def camel_to_kebab(name):
@@ -21,7 +34,11 @@ def camel_to_kebab(name):
 
 router = DefaultRouter()
 for model in apps.get_containing_app_config(__package__).get_models():
+    if model in views.INTERNAL_MODELS:
+        continue
     route_name = camel_to_kebab(model.__name__)
-    router.register(route_name, get_generic_viewset(model))
+    router.register(route_name, views.MODEL_VIEWSETS.get(model) or get_generic_viewset(model))
+    urlpatterns.append(
+        path(f'async/{route_name}/', async_views.model_list_view, {'model': model}, name=f'async-{route_name}-list'))
 
 urlpatterns += [path('', include(router.urls))]
@@ -1,21 +1,103 @@
 from rest_framework.viewsets import ModelViewSet
-from .serializers import get_auto_serializer
+from .serializers import AddressRowSerializer, PurchaseSerializer, get_auto_serializer
+from .base_serializers import with_related
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth.models import User
-from django.shortcuts import redirect, render
+from django.shortcuts import get_object_or_404, redirect, render
 from django.apps import apps
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
+from django.core.exceptions import FieldError
 from rest_framework.response import Response
-from django.db.models import ForeignKey
+from rest_framework.exceptions import ValidationError
+from rest_framework import status
+from rest_framework.utils.encoders import JSONEncoder
+from django.db.models import ForeignKey, F, Sum
+from django.db.transaction import atomic
+from .models import ChallanSequence, Customer, CustomerAddress, InventorySnapshot, PrinterUnit, Purchase, PurchaseItem, Rental, RentalReturn
+from .search import serial_search, serial_typeahead
+from . import imports, reports
+import json
+import zipfile
+
+# Query params of custom_model_list_view that shape the response instead of filtering it
+LIST_PARAMS = {"fields", "limit", "cursor", "stream"}
+MAX_LIST_LIMIT = 1000
+STREAM_CHUNK_SIZE = 2000
+TYPEAHEAD_LIMIT = 20
+PICKER_PAGE_SIZE = 50
+
+
+def parse_id_list(request, key):
+    value = request.data.get(key)
+    try:
+        # A string is iterable too, and "12" would otherwise read as the ids 1 and 2
+        if value is not None and not isinstance(value, list):
+            raise TypeError(value)
+        ids = [int(pk) for pk in value or []]
+    except (TypeError, ValueError):
+        raise ValidationError({key: "Expected a list of ids."})
+    if not ids:
+        raise ValidationError({key: f"Select at least one {key.replace('_', ' ').removesuffix('s')}."})
+    return ids
+
+
+def parse_int_param(params, key, default=None):
+    try:
+        return int(params[key]) if params.get(key) else default
+    except ValueError:
+        raise ValidationError({key: "Expected an integer."})
+
+
+def stream_json_array(rows):
+    yield "["
+    buffer = []
+    for i, row in enumerate(rows):
+        buffer.append(("," if i else "") + json.dumps(row, cls=JSONEncoder))
+        if len(buffer) == STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    yield "".join(buffer) + "]"
+
 
 def get_generic_viewset(model_class):
     class GenericViewSet(ModelViewSet):
-        queryset = model_class.objects.all()
+        queryset = with_related(model_class.objects.all())
         serializer_class = get_auto_serializer(model_class)
 
     return GenericViewSet
 
+
+class PurchaseViewSet(get_generic_viewset(Purchase)):
+    serializer_class = PurchaseSerializer
+
+    def get_queryset(self):
+        return reports.purchase_totals(super().get_queryset())
+
+    # Saving drops the totals annotations and DRF clears the prefetched items; re-read both for the response
+    def perform_create(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+
+class RentalViewSet(get_generic_viewset(Rental)):
+    def perform_update(self, serializer):
+        # Approving rents the units, which fails if any of them has left the store since the rental was drafted
+        try:
+            serializer.save()
+        except ValueError as e:
+            raise ValidationError({"approved": str(e)})
+
+
+# Models whose router endpoint needs more than the generic viewset
+MODEL_VIEWSETS = {Purchase: PurchaseViewSet, Rental: RentalViewSet}
+# Bookkeeping tables only the model methods write; they get no router or async list routes
+INTERNAL_MODELS = {ChallanSequence, InventorySnapshot}
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def signup_view(request):
@@ -41,9 +123,11 @@ def signup_view(request):
     )
 
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def custom_model_list_view(request, model_name):
+def custom_model_query(model_name, params):
+    """
+    Resolve /custom/<model>/ query params into (queryset, row serializer, page limit or None). The queryset is
+    unevaluated, so the sync and async list views share everything but the fetch.
+    """
     model_class_name = ''.join(w.capitalize() for w in model_name.split('-'))
     try:
         model = apps.get_model('api', model_class_name)
@@ -54,8 +138,10 @@ def custom_model_list_view(request, model_name):
     filters = {}
     nested_lookup = False
 
-    for k, v in request.query_params.items():  # or request.data if POST
-        if '__' in k:
+    for k, v in params.items():  # or request.data if POST
+        if k in LIST_PARAMS:
+            continue
+        elif '__' in k:
             # allow nested lookups
             filters[k] = v
             nested_lookup = True
@@ -69,5 +155,198 @@ def custom_model_list_view(request, model_name):
     if nested_lookup:
         qs = qs.distinct() 
 
-    return Response(get_auto_serializer(model)(qs, many=True).data)
+    # fields=id,name returns plain .values() rows, skipping model instances and the nested serializer
+    projection = [f for f in params.get("fields", "").split(",") if f]
+    paginate = "limit" in params or "cursor" in params
+    if projection:
+        if paginate and "id" not in projection:
+            projection.append("id")
+        try:
+            qs = qs.values(*projection)
+        except FieldError as e:
+            raise ValidationError({"fields": str(e)})
+        serialize = dict
+    else:
+        qs = with_related(qs)
+        serialize = get_auto_serializer(model)().to_representation
+
+    if not paginate:
+        return qs, serialize, None
+    limit = max(1, min(parse_int_param(params, "limit", MAX_LIST_LIMIT), MAX_LIST_LIMIT))
+    qs = qs.order_by("id")
+    if (cursor := parse_int_param(params, "cursor")) is not None:
+        qs = qs.filter(id__gt=cursor)
+    # One extra row tells whether another page exists
+    return qs[:limit + 1], serialize, limit
+
+
+def cursor_page(rows, limit):
+    return {
+        "results": rows[:limit],
+        "next_cursor": rows[limit - 1]["id"] if len(rows) > limit else None,
+    }
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def custom_model_list_view(request, model_name):
+    qs, serialize, limit = custom_model_query(model_name, request.query_params)
+    if limit:
+        return Response(cursor_page([serialize(row) for row in qs], limit))
+
+    if request.query_params.get("stream"):
+        rows = (serialize(row) for row in qs.iterator(chunk_size=STREAM_CHUNK_SIZE))
+        return StreamingHttpResponse(stream_json_array(rows), content_type="application/json")
+
+    return Response([serialize(row) for row in qs])
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def rental_batch_create_view(request):
+    unit_ids = parse_id_list(request, "printer_units")
+    serializer = get_auto_serializer(Rental)(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    with atomic():
+        rental = serializer.save()
+        try:
+            rental.add_units(unit_ids)
+        except ValueError as e:
+            raise ValidationError({"printer_units": str(e)})
+    return Response({**serializer.data, "printer_units": sorted(set(unit_ids))}, status=status.HTTP_201_CREATED)
+
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def rental_return_batch_create_view(request):
+    units = request.data.get("units") or []
+    try:
+        returns = {int(u["printer_unit"]): bool(u.get("scrapped")) for u in units}
+    except (TypeError, ValueError, KeyError):
+        raise ValidationError({"units": "Expected a list of {printer_unit, scrapped} objects."})
+    if not returns:
+        raise ValidationError({"units": "Select at least one unit to return."})
+    serializer = get_auto_serializer(RentalReturn)(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    with atomic():
+        rental_return = serializer.save()
+        try:
+            rental_return.return_units(returns)
+        except ValueError as e:
+            raise ValidationError({"units": str(e)})
+    return Response({**serializer.data, "units": [
+        {"printer_unit": pk, "scrapped": scrapped} for pk, scrapped in sorted(returns.items())
+    ]}, status=status.HTTP_201_CREATED)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def customer_batch_upsert_view(request):
+    """Create a customer, or update the one given by `id`, and upsert its `addresses`, all or nothing."""
+    rows = AddressRowSerializer(data=request.data.get("addresses") or [], many=True)
+    if not rows.is_valid():
+        raise ValidationError({"addresses": rows.errors})
+    if not rows.validated_data:
+        raise ValidationError({"addresses": "Add at least one address."})
+    customer_id = parse_int_param(request.data, "id")
+    customer = get_object_or_404(Customer, pk=customer_id) if customer_id else None
+    serializer = get_auto_serializer(Customer)(customer, data=request.data, partial=customer is not None)
+    serializer.is_valid(raise_exception=True)
+    with atomic():
+        customer = serializer.save()
+        addresses = customer.upsert_addresses((r["address"], r.get("mobile") or None) for r in rows.validated_data)
+    return Response({
+        **serializer.data, "addresses": get_auto_serializer(CustomerAddress)(addresses, many=True).data,
+    }, status=status.HTTP_200_OK if customer_id else status.HTTP_201_CREATED)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def purchase_item_serials_view(request, pk):
+    """Assign the scanned `serial_numbers` to the item's units that have none yet."""
+    item = get_object_or_404(PurchaseItem, pk=pk)
+    serial_numbers = request.data.get("serial_numbers")
+    if not isinstance(serial_numbers, list) or not all(isinstance(s, str) for s in serial_numbers):
+        raise ValidationError({"serial_numbers": "Expected a list of serial numbers."})
+    try:
+        units = item.assign_serials(serial_numbers)
+    except ValueError as e:
+        raise ValidationError({"serial_numbers": str(e)})
+    return Response({
+        "units": [{"id": u.pk, "serial_number": u.serial_number} for u in units],
+        "remaining": item.purchased_printer_units.filter(serial_number__isnull=True).count(),
+    })
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def import_view(request, kind):
+    """Import the uploaded `file` (CSV or XLSX) as `kind` and return the per-row report."""
+    if kind not in imports.IMPORT_KINDS:
+        raise Http404(f"Cannot import {kind!r}.")
+    if not (upload := request.FILES.get("file")):
+        raise ValidationError({"file": "Upload a .csv or .xlsx file."})
+    try:
+        report = imports.import_file(kind, upload, imports.import_format(upload.name))
+    except (ValueError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+        raise ValidationError({"file": str(e)})
+    return Response(report.as_dict())
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def inventory_by_status_view(request):
+    try:
+        filters = reports.report_filters(request.query_params)
+    except ValueError as e:
+        raise ValidationError({"detail": str(e)})
+    return Response(reports.inventory_by_status(**filters))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def printer_unit_search_view(request):
+    units = PrinterUnit.objects.all()
+    if status_filter := request.query_params.get("status"):
+        units = units.filter(status=status_filter)
+    limit = max(1, min(parse_int_param(request.query_params, "limit", TYPEAHEAD_LIMIT), MAX_LIST_LIMIT))
+    matches = serial_typeahead(units, request.query_params.get("q", ""), limit)
+    return Response(list(matches.values("id", "serial_number", "status", printer_model_name=F("printer_model__name"))))
+
+
+def required_int_param(params, key):
+    if (value := parse_int_param(params, key)) is None:
+        raise ValidationError({key: "This field is required."})
+    return value
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def printer_unit_available_models_view(request):
+    """Printer models with in-store units at `store`, and how many, read from the inventory snapshot."""
+    store_id = required_int_param(request.query_params, "store")
+    rows = (
+        InventorySnapshot.objects.filter(store_id=store_id, status=PrinterUnit.STATUS_INSTORE)
+        .values("printer_model_id", "printer_model__name").annotate(available=Sum("count"))
+        .filter(available__gt=0).order_by("printer_model__name")
+    )
+    return Response([
+        {"id": r["printer_model_id"], "name": r["printer_model__name"], "available": r["available"]} for r in rows
+    ])
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def printer_unit_available_view(request):
+    """A cursor page of in-store units of one `store` and `printer_model`, narrowed to serials containing `q`."""
+    params = request.query_params
+    units = PrinterUnit.objects.filter(
+        store_id=required_int_param(params, "store"), printer_model_id=required_int_param(params, "printer_model"),
+        status=PrinterUnit.STATUS_INSTORE,
+    )
+    if query := params.get("q", "").strip():
+        units = serial_search(units, query)
+    if cursor := parse_int_param(params, "cursor"):
+        units = units.filter(pk__gt=cursor)
+    limit = max(1, min(parse_int_param(params, "limit", PICKER_PAGE_SIZE), MAX_LIST_LIMIT))
+    return Response(cursor_page(list(units.order_by("pk").values("id", "serial_number")[:limit + 1]), limit))
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,7 +61,7 @@ ROOT_URLCONF = 'djangoProject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'api.profiling.ProfiledDjangoTemplates',
         'DIRS': [BASE_DIR / 'frontend' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -160,6 +161,18 @@ LOGIN_REDIRECT_URL = "/"
 # Where to send user after logout (if using Django LogoutView)
 LOGOUT_REDIRECT_URL = "/login/"
 
+# Versioned lookups (api.cache) and rendered challans. Local memory is per process; point CACHE_URL at a shared
+# backend such as rediscache://127.0.0.1:6379/1 when running several workers.
+CACHES = {
+    'default': env.cache("CACHE_URL", default="locmemcache://"),
+}
+# Seconds a rendered challan PDF is cached. With a per-process cache an edit only invalidates the worker that made
+# it, so other workers serve the old PDF for up to this long. Raise it (e.g. to 86400) only with a shared CACHE_URL.
+CHALLAN_CACHE_TIMEOUT = env.int("CHALLAN_CACHE_TIMEOUT", default=60)
+
+# Rows per page on the frontend list views
+PAGE_SIZE = env.int("PAGE_SIZE", default=10)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
@@ -167,4 +180,27 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-}
\ No newline at end of file
+}
+
+# Per-request query/timing profile (api.profiling). Server-Timing exposes internals, so it is off unless DEBUG.
+PROFILING_SERVER_TIMING = env.bool("PROFILING_SERVER_TIMING", default=DEBUG)
+# Requests at least this slow (ms) log their full query list; 0 turns the sampler off
+PROFILING_SLOW_REQUEST_MS = env.int("PROFILING_SLOW_REQUEST_MS", default=0)
+PROFILING_SLOW_SAMPLE_RATE = env.float("PROFILING_SLOW_SAMPLE_RATE", default=1.0)
+
+# The per-request JSON lines are logged at INFO, so they stay off unless PROFILING_LOG_LEVEL=INFO; slow-request
+# samples are warnings and still show
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ['console'],
+            'level': env("PROFILING_LOG_LEVEL", default="WARNING"),
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,87 @@
+import json
+import tracemalloc
+from statistics import median
+from time import perf_counter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.transaction import atomic, set_rollback
+from django.test import Client
+from django.test.utils import override_settings
+from api.fixtures import generate_fleet
+from api.route_catalog import api_requests, fetch
+from frontend.route_catalog import frontend_requests
+
+# Differences below these are noise, whatever the ratio
+LATENCY_FLOOR_MS = 5
+MEMORY_FLOOR_KIB = 256
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every frontend page and API route, recording queries, median latency and peak memory. Compare with "
+        "a saved baseline to catch N+1 queries and slowdowns. Rows written by the run, including --seed, are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", action="store_true", help="Generate the default fixture fleet first.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--baseline", help="JSON baseline to compare with.")
+        parser.add_argument("--save", help="Write this run's numbers to this JSON file.")
+        parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed latency/memory ratio to baseline.")
+
+    def handle(self, *args, **options):
+        with atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            if options["seed"]:
+                generate_fleet()
+            client = Client()
+            client.force_login(User.objects.create_user("route-benchmark"))
+            results = {}
+            self.stdout.write(f"{'route':<40} {'status':>6} {'queries':>7} {'ms':>9} {'peak KiB':>9}")
+            for label, path, params in frontend_requests() + api_requests():
+                fetch(client, path, params)  # warm caches
+                response, queries = fetch(client, path, params)
+                timings = []
+                for _ in range(options["repeat"]):
+                    start = perf_counter()
+                    fetch(client, path, params)
+                    timings.append(perf_counter() - start)
+                tracemalloc.start()
+                fetch(client, path, params)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                results[label] = {
+                    "status": response.status_code, "queries": queries,
+                    "ms": round(median(timings) * 1000, 2), "peak_kib": round(peak / 1024, 1),
+                }
+                row = results[label]
+                self.stdout.write(
+                    f"{label:<40} {row['status']:>6} {row['queries']:>7} {row['ms']:>9.2f} {row['peak_kib']:>9.1f}")
+            set_rollback(True)
+
+        if options["save"]:
+            with open(options["save"], "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            if regressions := self.regressions(baseline, results, options["tolerance"]):
+                for line in regressions:
+                    self.stderr.write(line)
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+
+    def regressions(self, baseline, results, tolerance):
+        found = []
+        for label, row in results.items():
+            if (base := baseline.get(label)) is None:
+                continue
+            if row["status"] != base["status"]:
+                found.append(f"{label}: status {base['status']} -> {row['status']}")
+            if row["queries"] > base["queries"]:
+                found.append(f"{label}: {base['queries']} -> {row['queries']} queries")
+            if row["ms"] > base["ms"] * tolerance and row["ms"] - base["ms"] > LATENCY_FLOOR_MS:
+                found.append(f"{label}: {base['ms']} -> {row['ms']} ms")
+            if row["peak_kib"] > base["peak_kib"] * tolerance and row["peak_kib"] - base["peak_kib"] > MEMORY_FLOOR_KIB:
+                found.append(f"{label}: {base['peak_kib']} -> {row['peak_kib']} KiB peak")
+        return found
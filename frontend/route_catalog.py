@@ -0,0 +1,48 @@
+"""
+Every GET-able frontend page, as concrete (label, path, params) requests against whatever rows the database holds.
+Shared by the page query-count tests and `benchmark_routes` so a new page cannot dodge either.
+"""
+from django.urls import reverse
+from api.models import Customer, PrinterUnit, Purchase, PurchaseItem, Rental, RentalReturn
+from api.route_catalog import first_pk
+from . import urls as frontend_urls
+from .views import master_data_models
+
+# Pages that also stream a CSV/XLSX download
+EXPORTABLE = {
+    "printer_unit_list", "rental_list", "rental_return_list", "inventory_in_store", "inventory_on_rent",
+    "inventory_by_status",
+}
+
+
+def month_of(queryset):
+    day = queryset.order_by("challan_date").values_list("challan_date", flat=True).first()
+    return day and f"{day:%Y-%m}"
+
+
+def frontend_requests():
+    path_values = {
+        "purchase_id": first_pk(Purchase.objects), "purchase_item_id": first_pk(PurchaseItem.objects),
+        "rental_id": first_pk(Rental.objects),
+        "rental_return_id": first_pk(RentalReturn.objects),
+    }
+    query_values = {
+        "printer_unit_edit": {"id": first_pk(PrinterUnit.objects)},
+        "customer_edit": {"id": first_pk(Customer.objects)},
+        "rental_month_challan_pdf": {"month": month_of(Rental.objects.filter(approved=True))},
+        "rental_return_month_challan_pdf": {"month": month_of(RentalReturn.objects)},
+    }
+    requests = []
+    for pattern in frontend_urls.urlpatterns:
+        name = pattern.name
+        if "kebab_case_model" in pattern.pattern.converters:
+            for kebab, model in master_data_models.items():
+                path = reverse(f"frontend:{name}", kwargs={"kebab_case_model": kebab})
+                params = {"id": first_pk(model.objects)} if name == "master_data_edit" else {}
+                requests.append((f"{name}:{kebab}", path, params))
+            continue
+        kwargs = {key: path_values[key] for key in pattern.pattern.converters}
+        requests.append((name, reverse(f"frontend:{name}", kwargs=kwargs), query_values.get(name, {})))
+        if name in EXPORTABLE:
+            requests.append((f"{name}:csv", reverse(f"frontend:{name}"), {"export": "csv"}))
+    return requests
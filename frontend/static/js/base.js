@@ -56,23 +56,28 @@ $(function () {
     flatpickr(".flatpickr", { dateFormat: "Y-m-d", maxDate: "today" });
 });
 
-function pagination(pageNo, count) {
+// cursors.before / cursors.after let Previous / Next seek from the current page instead of using an offset
+function pagination(pageNo, count, pageSize = 10, cursors = {}) {
     const urlParams = new URLSearchParams(window.location.search);
+    urlParams.delete("before");
+    urlParams.delete("after");
     function liHTML(value, isDisabled = false, isCurrentPage = false) {
         let newParams = new URLSearchParams(urlParams);
         if (!isNaN(value)) {
             newParams.set("page_no", value);
         } else if (value === "Previous") {
             newParams.set("page_no", pageNo - 1);
+            if (cursors.before) newParams.set("before", cursors.before);
         } else if (value === "Next") {
             newParams.set("page_no", pageNo + 1);
+            if (cursors.after) newParams.set("after", cursors.after);
         }
         return `<li class="page-item${isDisabled ? ' disabled' : ''}${isCurrentPage ? ' active' : ''}">
                     <a class="page-link" href="?${newParams.toString()}">${value}</a>
                 </li>`;
     }
 
-    const pageCount = Math.ceil(count / 10);
+    const pageCount = Math.ceil(count / pageSize);
     if (pageCount === 0) {
         $(".pagination").html('');
         return;
@@ -110,17 +115,12 @@ function pagination(pageNo, count) {
     $(".pagination").html(arr.join(''));
 }
 
-function getCustomModel(modelName, data) {
-    var result = null;
-    $.ajax({
+function fetchCustomModel(modelName, data) {
+    return $.ajax({
         url: "/api/custom/" + modelName + "/",
         method: "GET",
         data: data,
-        async: false,
-        success: function (data) { result = data; },
-        error: function (xhr) { console.error(xhr.responseText); }
-    });
-    return result;
+    }).fail(xhr => console.error(xhr.responseText));
 }
 
 function mapToChoices(array) {
@@ -1,4 +1,5 @@
 from django import template
+from django.conf import settings
 from django.db.models import Model, Field
 import re
 
@@ -76,8 +77,7 @@ def field_class(field):
 
 @register.filter
 def serial_no(counter, page_no):
-    page_size = 10
-    return (page_no - 1) * page_size + counter
+    return (page_no - 1) * settings.PAGE_SIZE + counter
 
 @register.filter
 def get_item(dictionary, key):
@@ -86,4 +86,13 @@ def get_item(dictionary, key):
 @register.filter
 def inner_length(d):
     return sum(len(v) for v in d.values() if isinstance(v, dict))
+
+@register.simple_tag(takes_context=True)
+def export_query(context, export_format):
+    # The current filters with paging dropped, so an export covers every matching row
+    params = context["request"].GET.copy()
+    for key in ("page_no", "before", "after", "export"):
+        params.pop(key, None)
+    params["export"] = export_format
+    return params.urlencode()
 # ------------------------------------------------------------------------------------------
\ No newline at end of file
@@ -1,3 +1,124 @@
-from django.test import TestCase
+from base64 import urlsafe_b64encode
+from datetime import date
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+from api.fixtures import generate_fleet
+from api.models import PrinterModel, PrinterUnit, Purchase, PurchaseItem, Store, Vendor
+from api.route_catalog import fetch
+from .route_catalog import frontend_requests
+from .views import paginate, seek_iterator
 
-# Create your tests here.
+SMALL_FLEET = dict(customers=10, units=300, years=1, printer_models=5, stores=2, vendors=2, rentals_per_month=4)
+
+# Warm-cache queries per page, session and user lookups included. Every page needs an entry.
+QUERY_CEILINGS = {
+    "login": 2, "signup": 2, "home": 2,
+    "printer_unit_list": 3, "printer_unit_list:csv": 3, "printer_unit_add": 2, "printer_unit_edit": 3,
+    "customer_list": 4, "customer_add": 2, "customer_edit": 4,
+    **{f"master_data_list:{m}": 3 for m in ("printer-model", "store", "vendor")},
+    **{f"master_data_add:{m}": 2 for m in ("printer-model", "store", "vendor")},
+    **{f"master_data_edit:{m}": 3 for m in ("printer-model", "store", "vendor")},
+    "purchase_list": 4, "purchase_add": 2, "purchase_item_list": 4, "purchase_item_serials": 4,
+    "rental_list": 3, "rental_list:csv": 3, "rental_add": 2, "rental_item_list": 4,
+    "rental_challan_pdf": 2, "rental_month_challan_pdf": 4,
+    "rental_return_list": 3, "rental_return_list:csv": 3, "rental_return_add": 2, "rental_return_item_list": 4,
+    "rental_return_challan_pdf": 2, "rental_return_month_challan_pdf": 4,
+    "inventory_in_store": 3, "inventory_in_store:csv": 3, "inventory_on_rent": 3, "inventory_on_rent:csv": 3,
+    "inventory_by_status": 3, "inventory_by_status:csv": 3,
+}
+
+
+class PageQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_fleet(**SMALL_FLEET, seed=1)
+        cls.user = User.objects.create_user("tester")
+
+    def query_counts(self):
+        counts = {}
+        for label, path, params in frontend_requests():
+            fetch(self.client, path, params)  # warm caches
+            response, queries = fetch(self.client, path, params)
+            counts[label] = (response.status_code, queries)
+        return counts
+
+    def test_pages_stay_under_ceilings_as_data_grows(self):
+        self.client.force_login(self.user)
+        counts = self.query_counts()
+        self.assertEqual(counts.keys(), QUERY_CEILINGS.keys())
+        generate_fleet(**SMALL_FLEET, seed=2)
+        for label, (status, queries) in self.query_counts().items():
+            with self.subTest(label):
+                self.assertLess(status, 400)
+                self.assertLessEqual(queries, QUERY_CEILINGS[label])
+                self.assertEqual(queries, counts[label][1], "query count grows with the data")
+
+
+class InventoryByStatusTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("tester"))
+        self.stores = [Store.objects.create(name=f"Store {i}", address="Street") for i in range(2)]
+        vendor = Vendor.objects.create(name="Acme Vendor", address="Street", mobile="0")
+        purchase = Purchase.objects.create(vendor=vendor, store=self.stores[0], date=date(2025, 6, 1))
+        item = PurchaseItem.objects.create(
+            purchase=purchase, printer_model=PrinterModel.objects.create(name="Model 1"), quantity=3)
+        moved = item.purchased_printer_units.first()
+        moved.store = self.stores[1]
+        moved.save()
+
+    def test_store_filter_uses_the_units_current_store(self):
+        for params in ({}, {"date_from": "2025-01-01"}):
+            for store, instore in zip(self.stores, (2, 1)):
+                response = self.client.get("/inventory-by-status/", {**params, "store": store.pk})
+                self.assertEqual([row["instore"] for row in response.context["printer_list"]], [instore])
+
+    def test_bad_filters_are_a_form_error(self):
+        response = self.client.get("/inventory-by-status/", {"date_from": "bad"})
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, "Invalid date from &#x27;bad&#x27;", status_code=400)
+
+
+@override_settings(PAGE_SIZE=4)
+class KeysetPaginationTests(TestCase):
+    ordering = ["-printer_model_id", "id"]
+
+    def setUp(self):
+        store = Store.objects.create(name="Store", address="Street")
+        vendor = Vendor.objects.create(name="Acme Vendor", address="Street", mobile="0")
+        purchase = Purchase.objects.create(vendor=vendor, store=store, date=date(2025, 6, 1))
+        for name in ("Model A", "Model B"):
+            PurchaseItem.objects.create(purchase=purchase, printer_model=PrinterModel.objects.create(name=name), quantity=3)
+        self.ids = list(PrinterUnit.objects.order_by(*self.ordering).values_list("pk", flat=True))
+
+    def page(self, **params):
+        return paginate(RequestFactory().get("/", params), PrinterUnit.objects.all(), self.ordering)
+
+    def test_pages_forward_and_back_across_a_tie(self):
+        first = self.page()
+        self.assertEqual([u.pk for u in first["objects"]], self.ids[:4])
+        second = self.page(after=first["next_cursor"])
+        self.assertEqual([u.pk for u in second["objects"]], self.ids[4:])
+        back = self.page(before=second["prev_cursor"])
+        self.assertEqual([u.pk for u in back["objects"]], self.ids[:4])
+
+    def test_malformed_cursors_fall_back_to_the_numbered_page(self):
+        wrong_length = urlsafe_b64encode(b'["1"]').decode()
+        wrong_type = urlsafe_b64encode(b'["x", "y"]').decode()
+        for params in ({"after": "abc"}, {"before": wrong_length}, {"after": wrong_type}, {"page_no": "x"}):
+            with self.subTest(params):
+                self.assertEqual([u.pk for u in self.page(**params)["objects"]], self.ids[:4])
+        self.assertEqual([u.pk for u in self.page(page_no="2", after="abc")["objects"]], self.ids[4:])
+
+    def test_malformed_date_cursor_falls_back_on_date_ordered_lists(self):
+        self.client.force_login(User.objects.create_user("tester"))
+        cursor = urlsafe_b64encode(b'["bad", 1]').decode()
+        for path in ("/rental/", "/purchase/"):
+            for params in ({"after": cursor}, {"before": cursor}):
+                with self.subTest(path=path, **params):
+                    self.assertEqual(self.client.get(path, params).status_code, 200)
+
+    def test_seek_iterator_exports_every_row_in_order(self):
+        units = PrinterUnit.objects.all()
+        self.assertEqual([u.pk for u in seek_iterator(units, self.ordering, chunk_size=4)], self.ids)
+        self.assertEqual([u["id"] for u in seek_iterator(units.values("id", "printer_model_id"), self.ordering, 3)],
+                         self.ids)
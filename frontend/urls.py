@@ -24,16 +24,19 @@ urlpatterns = [
     path('purchase/', views.purchase_list, name='purchase_list'),
     path('purchase/add/', views.purchase_add, name='purchase_add'),
     path('purchase/<int:purchase_id>/items/', views.purchase_item_list, name='purchase_item_list'),
+    path('purchase/item/<int:purchase_item_id>/serials/', views.purchase_item_serials, name='purchase_item_serials'),
     
     path('rental/', views.rental_list, name='rental_list'),
     path('rental/add/', views.rental_add, name='rental_add'),
     path('rental/<int:rental_id>/', views.rental_item_list, name='rental_item_list'),
     path('rental-challan-pdf/<int:rental_id>/', views.rental_challan_pdf, name='rental_challan_pdf'),
+    path('rental-challan-pdf/', views.rental_month_challan_pdf, name='rental_month_challan_pdf'),
     
     path('rental-return/', views.rental_return_list, name='rental_return_list'),
     path('rental-return/add/', views.rental_return_add, name='rental_return_add'),
     path('rental-return/<int:rental_return_id>/', views.rental_return_item_list, name='rental_return_item_list'),
-    # path('rental-return-challan-pdf/<int:rental_return_id>/', views.rental_return_challan_pdf, name='rental_return_challan_pdf'),
+    path('rental-return-challan-pdf/<int:rental_return_id>/', views.rental_return_challan_pdf, name='rental_return_challan_pdf'),
+    path('rental-return-challan-pdf/', views.rental_return_month_challan_pdf, name='rental_return_month_challan_pdf'),
     
     path('inventory-in-store/', views.inventory_in_store, name='inventory_in_store'),
     path('inventory-on-rent/', views.inventory_on_rent, name='inventory_on_rent'),
@@ -1,19 +1,117 @@
 from django.shortcuts import render, redirect
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
 from django.contrib.auth.decorators import login_required
-from api.models import PrinterModel, Store, Vendor, Customer, CustomerAddress, PrinterUnit, Purchase, Rental, RentalUnit, RentalReturn, RentalReturnUnit
+from api.models import PrinterModel, Store, Vendor, Customer, PrinterUnit, Purchase, PurchaseItem, Rental, RentalUnit, RentalReturn, RentalReturnUnit
+from django.conf import settings
+from django.db.models import Count, Q
+from django.core.exceptions import ValidationError
 import json
-from collections import defaultdict
-from django.db.models import Count  
-from itertools import chain
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import Counter
+from datetime import datetime, timedelta
+from api import challans, reports
+from api.cache import cached_count, cached_for, cached_list
+from api.search import serial_search
+from api.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_response
 
 master_data_models = {
     'printer-model': PrinterModel,
     'store': Store,
     'vendor': Vendor,
 }
-page_size = 10
-def paginated(qs, page_no):
-    return qs[(page_no - 1) * page_size : page_no * page_size]
+def encode_cursor(obj, ordering):
+    values = [str(getattr(obj, f.lstrip("-"))) for f in ordering]
+    return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor, ordering):
+    """The ordering values in `cursor`. Raises ValueError if it is malformed, e.g. from a hand-edited URL."""
+    values = json.loads(urlsafe_b64decode(cursor.encode()))
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError(f"Invalid cursor {cursor!r}.")
+    return values
+
+def seek_filter(ordering, values):
+    # Rows strictly after `values` in `ordering`: (a > x) OR (a = x AND b > y) OR ...
+    q = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        step = Q(**{f"{name}__{'lt' if field.startswith('-') else 'gt'}": values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{prev_field.lstrip("-"): prev_value})
+        q |= step
+    return q
+
+def paginate(request, qs, ordering):
+    """
+    Page `qs` by `ordering`, which must end in a unique field. Numbered pages use OFFSET, while the Previous/Next
+    links carry a before/after cursor so stepping through deep pages seeks on the ordering instead of scanning.
+    """
+    page_no = request.GET.get("page_no", "1")
+    page_no = max(1, int(page_no)) if page_no.isdigit() else 1
+    page_size = settings.PAGE_SIZE
+    qs = qs.order_by(*ordering)
+    # A malformed cursor, or one whose values do not fit the fields, falls back to the numbered page
+    objects = None
+    try:
+        if after := request.GET.get("after"):
+            objects = list(qs.filter(seek_filter(ordering, decode_cursor(after, ordering)))[:page_size])
+        elif before := request.GET.get("before"):
+            reverse = [f[1:] if f.startswith("-") else f"-{f}" for f in ordering]
+            seek = qs.filter(seek_filter(reverse, decode_cursor(before, ordering))).order_by(*reverse)
+            objects = list(seek[:page_size])[::-1]
+    except (TypeError, ValueError, ValidationError):
+        pass
+    if objects is None:
+        objects = list(qs[(page_no - 1) * page_size : page_no * page_size])
+    return {
+        "objects": objects,
+        "page_no": page_no,
+        "page_size": page_size,
+        "count": cached_count(qs),
+        "prev_cursor": encode_cursor(objects[0], ordering) if objects else "",
+        "next_cursor": encode_cursor(objects[-1], ordering) if objects else "",
+    }
+
+def seek_iterator(qs, ordering, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Every row of `qs` (instances or .values() dicts) in `ordering`, fetched a chunk at a time by seeking past the
+    previous chunk. Unlike .iterator(), memory stays flat on MySQL too, whose driver buffers whole result sets.
+    """
+    qs = qs.order_by(*ordering)
+    after = None
+    while True:
+        chunk = list((qs.filter(seek_filter(ordering, after)) if after else qs)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        after = [last[f.lstrip("-")] if isinstance(last, dict) else getattr(last, f.lstrip("-")) for f in ordering]
+
+def export_format(request):
+    return request.GET.get("export") if request.GET.get("export") in EXPORT_FORMATS else None
+
+def rowspan_rows(records, group_keys):
+    """
+    Lay out records sorted by `group_keys` as table rows: the first row of each group gets
+    "<key>_rowspan" (and "sno" for the outermost group); the rest of the group leaves that cell out.
+    """
+    spans = Counter(
+        tuple(record[k] for k in group_keys[:depth])
+        for record in records for depth in range(1, len(group_keys) + 1)
+    )
+    rows, seen, sno = [], set(), 0
+    for record in records:
+        row = dict(record)
+        for depth, key in enumerate(group_keys, 1):
+            prefix = tuple(record[k] for k in group_keys[:depth])
+            if prefix not in seen:
+                seen.add(prefix)
+                row[f"{key}_rowspan"] = spans[prefix]
+                if depth == 1:
+                    sno += 1
+                    row["sno"] = sno
+        rows.append(row)
+    return rows
 
 def login(request):
     if request.user.is_authenticated:
@@ -31,20 +129,17 @@ def home(request):
 
 @login_required
 def master_data_list(request, kebab_case_model):
-    page_no = int(request.GET.get('page_no', "1"))
     Model = master_data_models[kebab_case_model]
     return render(request, "master_data/list.html", {   
-        "objects": paginated(Model.objects.order_by("id"),page_no),
+        **paginate(request, Model.objects.all(), ["id"]),
         "model": Model,
-        "page_no": page_no,
-        "count": Model.objects.count()
     })
 
 @login_required
 def master_data_add(request, kebab_case_model):
     Model = master_data_models[kebab_case_model]
     foreign_keys = {
-        f.name: f.remote_field.model.objects.all()
+        f.name: cached_list(f.remote_field.model.objects.all())
         for f in Model._meta.get_fields()
         if f.many_to_one and f.concrete
     }
@@ -57,7 +152,7 @@ def master_data_add(request, kebab_case_model):
 def master_data_edit(request, kebab_case_model):
     Model = master_data_models[kebab_case_model]
     foreign_keys = {
-        f.name: f.remote_field.model.objects.all()
+        f.name: cached_list(f.remote_field.model.objects.all())
         for f in Model._meta.get_fields()
         if f.many_to_one and f.concrete
     }
@@ -67,9 +162,15 @@ def master_data_edit(request, kebab_case_model):
         "foreign_keys": foreign_keys,
     })
 
+def unit_location(status, store_name, store_address, customer_name, customer_address):
+    if status == PrinterUnit.STATUS_INSTORE and store_name:
+        return store_name, store_address
+    if status == PrinterUnit.STATUS_RENTED and customer_name:
+        return customer_name, customer_address
+    return "—", "—"
+
 @login_required
 def printer_unit_list(request):
-    page_no = int(request.GET.get("page_no", "1"))
     status = request.GET.get("status")
     serial_no = request.GET.get("serial_no", "").strip()
     all_units_qs = PrinterUnit.objects.select_related(
@@ -77,35 +178,42 @@ def printer_unit_list(request):
         "store",
         "customer_address",
         "customer_address__customer",
-    ).order_by("id")
+    )
     if status:
         all_units_qs = all_units_qs.filter(status=status)
     if serial_no:
-        all_units_qs = all_units_qs.filter(serial_number__icontains=serial_no)
-    paginated_units = paginated(all_units_qs, page_no)
-    for unit in paginated_units:
-        if unit.status == PrinterUnit.STATUS_INSTORE and unit.store:
-            unit.location = unit.store.name
-            unit.address = unit.store.address
-        elif unit.status == PrinterUnit.STATUS_RENTED and unit.customer_address:
-            unit.location = unit.customer_address.customer.name
-            unit.address = unit.customer_address.address
-        else:
-            unit.location = "—"
-            unit.address = "—"
+        all_units_qs = serial_search(all_units_qs, serial_no)
+    if fmt := export_format(request):
+        units = seek_iterator(all_units_qs.values(
+            "id", "serial_number", "printer_model__name", "status", "store__name", "store__address",
+            "customer_address__customer__name", "customer_address__address",
+        ), ["id"])
+        statuses = dict(PrinterUnit.STATUS_CHOICES)
+        rows = (
+            (u["serial_number"], u["printer_model__name"], statuses[u["status"]], *unit_location(
+                u["status"], u["store__name"], u["store__address"],
+                u["customer_address__customer__name"], u["customer_address__address"]))
+            for u in units
+        )
+        return export_response(fmt, "printer_units", ["Serial No", "Model", "Status", "Location", "Address"], rows)
+    page = paginate(request, all_units_qs, ["id"])
+    for unit in page["objects"]:
+        unit.location, unit.address = unit_location(
+            unit.status, unit.store and unit.store.name, unit.store and unit.store.address,
+            unit.customer_address and unit.customer_address.customer.name,
+            unit.customer_address and unit.customer_address.address,
+        )
 
     return render(request, "master_data/printer_unit/list.html", {
-        "objects": paginated_units,
-        "page_no": page_no,
-        "count": all_units_qs.count(),
+        **page,
         "status": status,
         "serial_no": serial_no,
     })
 
 @login_required
 def printer_unit_add(request):
-    printer_models = PrinterModel.objects.all().order_by("name")
-    stores = Store.objects.all().order_by("name")
+    printer_models = cached_list(PrinterModel.objects.order_by("name"))
+    stores = cached_list(Store.objects.order_by("name"))
     
     return render(request, "master_data/printer_unit/add.html", {
         "printer_models": printer_models,
@@ -119,20 +227,14 @@ def printer_unit_edit(request):
     
     return render(request, "master_data/printer_unit/edit.html", {
         "edit_object": unit,
-        "printer_models": PrinterModel.objects.all().order_by("name"),
-        "stores": Store.objects.all().order_by("name"),
+        "printer_models": cached_list(PrinterModel.objects.order_by("name")),
+        "stores": cached_list(Store.objects.order_by("name")),
     })
     
 @login_required
 def customer_list(request):
-    page_no = int(request.GET.get("page_no", "1"))
-    all_customers_qs = Customer.objects.prefetch_related("addresses").order_by("id")
-    paginated_customers = paginated(all_customers_qs, page_no)
-    return render(request, "master_data/customer/list.html", {
-        "objects": paginated_customers,
-        "page_no": page_no,
-        "count": all_customers_qs.count(),
-    })
+    all_customers_qs = Customer.objects.prefetch_related("addresses")
+    return render(request, "master_data/customer/list.html", paginate(request, all_customers_qs, ["id"]))
     
 @login_required
 def customer_add(request):
@@ -148,63 +250,62 @@ def customer_edit(request):
 
 @login_required
 def purchase_list(request):
-    page_no = int(request.GET.get("page_no", "1"))
-    all_purchases_qs = Purchase.objects.select_related("vendor","store").prefetch_related("items__purchased_printer_units").order_by("-date")
-    paginated_purchases = paginated(all_purchases_qs,page_no)
-    for purchase in paginated_purchases:
-        purchase.printer_count = sum(len(item.purchased_printer_units.all())for item in purchase.items.all())
-    return render(request, "purchase/list.html", {
-        "objects": paginated_purchases,
-        "page_no": page_no,
-        "count": all_purchases_qs.count(),
-    })
+    all_purchases_qs = reports.purchase_totals(Purchase.objects.select_related("vendor","store"))
+    return render(request, "purchase/list.html", paginate(request, all_purchases_qs, ["-date", "-id"]))
     
 @login_required
 def purchase_add(request):
-    vendors = Vendor.objects.all().order_by("name")
-    stores = Store.objects.all().order_by("name")
-    printer_models = list(PrinterModel.objects.all().order_by("name").values("id", "name"))
+    vendors = cached_list(Vendor.objects.order_by("name"))
+    stores = cached_list(Store.objects.order_by("name"))
+    printer_models = cached_for("purchase-add-printer-models", [PrinterModel], lambda: json.dumps(
+        list(PrinterModel.objects.order_by("name").values("id", "name"))))
 
     return render(request, "purchase/add.html", {
         "vendors": vendors,
         "stores": stores,
-        "printer_models": json.dumps(printer_models),
+        "printer_models": printer_models,
     })
 
 @login_required
 def purchase_item_list(request, purchase_id):
-    purchase = Purchase.objects.prefetch_related('items__printer_model').get(id=purchase_id)
-    items = purchase.items.all()
+    purchase = Purchase.objects.get(id=purchase_id)
+    items = purchase.items.select_related("printer_model").annotate(
+        serialled=Count("purchased_printer_units", filter=Q(purchased_printer_units__serial_number__isnull=False)))
     return render(request, "purchase/purchase_item/list.html", {
         "purchase": purchase,
         "items": items,
     })
 
 @login_required
-def rental_list(request):
-    page_no = int(request.GET.get("page_no", "1"))
-    all_rentals_qs = Rental.objects.select_related("store", "customer_address", "customer_address__customer"
-        ).order_by("-challan_date")
-    paginated_rentals = paginated(all_rentals_qs, page_no)
-    return render(request, "rental/list.html", {
-        "objects": paginated_rentals,
-        "page_no": page_no,
-        "count": all_rentals_qs.count(),
+def purchase_item_serials(request, purchase_item_id):
+    item = PurchaseItem.objects.select_related("purchase", "printer_model").get(id=purchase_item_id)
+    return render(request, "purchase/purchase_item/serials.html", {
+        "item": item,
+        "remaining": item.purchased_printer_units.filter(serial_number__isnull=True).count(),
     })
 
+CHALLAN_EXPORT_COLUMNS = ["Challan No", "Challan Date", "Order No", "Order Date", "Store", "Customer", "Address"]
+
+@login_required
+def rental_list(request):
+    all_rentals_qs = Rental.objects.select_related("store", "customer_address", "customer_address__customer")
+    if fmt := export_format(request):
+        rows = (
+            (r.challan_no, r.challan_date, r.order_no, r.order_date, r.store.name,
+             r.customer_address.customer.name, r.customer_address.address, "Yes" if r.approved else "No")
+            for r in seek_iterator(all_rentals_qs, ["-challan_date", "-id"])
+        )
+        return export_response(fmt, "rentals", CHALLAN_EXPORT_COLUMNS + ["Approved"], rows)
+    return render(request, "rental/list.html", paginate(request, all_rentals_qs, ["-challan_date", "-id"]))
+
 @login_required
 def rental_add(request):
-    stores = Store.objects.all().order_by("name")
-    customers = Customer.objects.all().order_by("name")
-    customer_addresses = CustomerAddress.objects.all()
-    printer_models = PrinterModel.objects.all().order_by("name")
-    printer_units = PrinterUnit.objects.order_by("serial_number")
+    # Addresses, models and units are fetched for the chosen customer and store (api printer-unit/available)
+    stores = cached_list(Store.objects.order_by("name"))
+    customers = cached_list(Customer.objects.order_by("name"))
     return render(request, "rental/add.html", {
         "stores": stores,
         "customers": customers,
-        "customer_addresses": customer_addresses,
-        "printer_models": printer_models,
-        "printer_units": printer_units,
     })
 
 @login_required
@@ -219,40 +320,60 @@ def rental_item_list(request, rental_id):
         "printer_dict": printer_dict,
     })
 
+def challan_response(filename, pdf):
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = f'inline; filename="{filename}"'
+    return response
+
+
+def single_challan_pdf(model, pk):
+    try:
+        return challan_response(*challans.challan_pdf(model, pk))
+    except model.DoesNotExist:
+        raise Http404()
+
+
+def month_challans_pdf(request, queryset):
+    """All challans of `queryset` dated in ?month=YYYY-MM, in one file for month-end printing."""
+    try:
+        first = datetime.strptime(request.GET.get("month", ""), "%Y-%m").date()
+    except ValueError:
+        return HttpResponseBadRequest("Expected ?month=YYYY-MM.")
+    last = (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    loaded = challans.load_challans(queryset.filter(challan_date__range=(first, last)).order_by("challan_date", "id"))
+    if not loaded:
+        raise Http404("No challans in this month.")
+    return challan_response(f"challans-{first:%Y-%m}.pdf", challans.render_challans(queryset.model, loaded))
+
+
 @login_required
 def rental_challan_pdf(request, rental_id):
-    rental = Rental.objects.get(id=rental_id)
-    printer_units = PrinterUnit.objects.select_related('printer_model').filter(rental_entries__rental_id=rental_id)
-    printer_dict = {}
-    for unit in printer_units:
-        printer_dict.setdefault(unit.printer_model.name, []).append(unit.serial_number)
-    return render(request, "rental/rental_challan_pdf.html", {
-        "rental": rental,
-        "printer_dict": printer_dict,
-    })
-    
+    return single_challan_pdf(Rental, rental_id)
+
+
+@login_required
+def rental_month_challan_pdf(request):
+    return month_challans_pdf(request, Rental.objects.filter(approved=True))
+
 @login_required
 def rental_return_list(request):
-    page_no = int(request.GET.get("page_no", "1"))
     all_rental_returns_qs = RentalReturn.objects.select_related("store","customer_address","customer_address__customer",
-        ).order_by("-challan_date")
-    paginated_returns = paginated(all_rental_returns_qs, page_no)
-    return render(request, "rental_return/list.html", {
-        "objects": paginated_returns,
-        "page_no": page_no,
-        "count": all_rental_returns_qs.count(),
-    })
+        )
+    if fmt := export_format(request):
+        rows = (
+            (r.challan_no, r.challan_date, r.order_no, r.order_date, r.store.name,
+             r.customer_address.customer.name, r.customer_address.address)
+            for r in seek_iterator(all_rental_returns_qs, ["-challan_date", "-id"])
+        )
+        return export_response(fmt, "rental_returns", CHALLAN_EXPORT_COLUMNS, rows)
+    return render(request, "rental_return/list.html", paginate(request, all_rental_returns_qs, ["-challan_date", "-id"]))
 
 @login_required
 def rental_return_add(request):
-    stores = Store.objects.all().order_by("name")
-    customers = Customer.objects.all().order_by("name")
-    customer_addresses = CustomerAddress.objects.all()
-
+    # Customers and their addresses are fetched by the page's pickers
+    stores = cached_list(Store.objects.order_by("name"))
     return render(request, "rental_return/add.html", {
         "stores": stores,
-        "customers": customers,
-        "customer_addresses": customer_addresses,
     })
 
 @login_required
@@ -273,64 +394,44 @@ def rental_return_item_list(request, rental_return_id):
     })
 
 @login_required
-def inventory_in_store(request):
-    units = PrinterUnit.objects.select_related('printer_model', 'store').filter(
-        status=PrinterUnit.STATUS_INSTORE).order_by('printer_model__name', 'store__name')
-    printer_dict = {}
-    for unit in units:
-        printer_dict.setdefault(unit.printer_model.name, []).append(
-            (unit.store.name, unit.store.address, 1))
-    result = {}
-    for model, lst in printer_dict.items():
-        store_map = {}
-        for store, addr, _ in lst:
-            store_map[store] = store_map.get(store, (addr, 0))
-            store_map[store] = (addr, store_map[store][1]+1)
-        result[model] = [(s, a, q) for s, (a, q) in store_map.items()]
-    return render(request, "inventory_in_store/list.html", {"printer_dict": result})
+def rental_return_challan_pdf(request, rental_return_id):
+    return single_challan_pdf(RentalReturn, rental_return_id)
+
 
 @login_required
-def inventory_on_rentt(request):
-    units = PrinterUnit.objects.select_related('printer_model', 'customer_address', 'customer_address__customer'
-        ).filter(status=PrinterUnit.STATUS_RENTED).order_by('printer_model__name', 'customer_address__customer__name')
-    printer_dict = {}
-    for unit in units:
-        model = unit.printer_model.name
-        customer = unit.customer_address.customer.name
-        address = unit.customer_address.address
-        printer_dict.setdefault(model, []).append((customer, address, 1))
-    result = {}
-    for model, lst in printer_dict.items():
-        cust_map = {}
-        for cust, addr, _ in lst:
-            cust_map[cust] = cust_map.get(cust, (addr, 0))
-            cust_map[cust] = (addr, cust_map[cust][1] + 1)
-        result[model] = [(c, a, q) for c, (a, q) in cust_map.items()]
-    return render(request, "inventory_on_rent/list.html", {"printer_dict": result})
+def rental_return_month_challan_pdf(request):
+    return month_challans_pdf(request, RentalReturn.objects.all())
+
+
+@login_required
+def inventory_in_store(request):
+    if fmt := export_format(request):
+        rows = reports.inventory_in_store_query().values_list("model", "store_name", "address", "qty").iterator()
+        return export_response(fmt, "inventory_in_store", ["Model", "Store", "Address", "Quantity"], rows)
+    rows = rowspan_rows(reports.inventory_in_store(), ["model"])
+    return render(request, "inventory_in_store/list.html", {"rows": rows})
 
 @login_required
 def inventory_on_rent(request):
-    data = defaultdict(lambda: defaultdict(dict))
-    for r in PrinterUnit.objects.filter(status=PrinterUnit.STATUS_RENTED).values(
-        'printer_model__name','customer_address__customer__name','customer_address__address').annotate(qty=Count('id')):
-        data[r['printer_model__name']][r['customer_address__customer__name']][r['customer_address__address']] = r['qty']
-    rows = [{"sno": i+1 if j==0 and k==0 else None, "model": m if j==0 and k==0 else None,
-            "model_rowspan": sum(len(v) for v in c.values()) if j==0 and k==0 else None,
-            "customer": u if k==0 else None, "customer_rowspan": len(a) if k==0 else None,
-            "address": ad, "qty": q}
-            for i,(m,c) in enumerate(data.items())
-            for j,(u,a) in enumerate(c.items())
-            for k,(ad,q) in enumerate(a.items())]
+    if fmt := export_format(request):
+        rows = reports.inventory_on_rent_query().values_list("model", "customer", "address", "qty").iterator()
+        return export_response(fmt, "inventory_on_rent", ["Model", "Customer", "Address", "Quantity"], rows)
+    rows = rowspan_rows(reports.inventory_on_rent(), ["model", "customer"])
     return render(request, "inventory_on_rent/list.html", {"rows": rows})
 
 @login_required
 def inventory_by_status(request):
-    units = PrinterUnit.objects.select_related('printer_model').all()
-    printer_dict = {}
-    for unit in units:
-        model = unit.printer_model.name
-        status = unit.status
-        printer_dict.setdefault(model, {"INSTORE":0, "RENTED":0, "SCRAPPED":0})
-        printer_dict[model][status] += 1
-    result = [(model, counts["INSTORE"], counts["RENTED"], counts["SCRAPPED"]) for model, counts in printer_dict.items()]
-    return render(request, "inventory_by_status/list.html", {"printer_list": result})
\ No newline at end of file
+    try:
+        filters = reports.report_filters(request.GET)
+    except ValueError as e:
+        return render(request, "inventory_by_status/list.html", {
+            "printer_list": [], "stores": cached_list(Store.objects.order_by("name")), "filters": {}, "error": str(e),
+        }, status=400)
+    if fmt := export_format(request):
+        rows = reports.inventory_by_status_query(**filters).values_list("model", "instore", "rented", "scrapped").iterator()
+        return export_response(fmt, "inventory_by_status", ["Model", "In Store", "Rented", "Scrapped"], rows)
+    return render(request, "inventory_by_status/list.html", {
+        "printer_list": reports.inventory_by_status(**filters),
+        "stores": cached_list(Store.objects.order_by("name")),
+        "filters": filters,
+    })
\ No newline at end of file